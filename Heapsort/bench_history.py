@@ -0,0 +1,244 @@
+import json
+import math
+import sqlite3
+import subprocess
+import time
+
+from benchmark import environment_info, load_json
+
+# история замеров: каждая запись run_tests добавляется, ничего не перезаписывается.
+# ключ строки - коммит (через прогон), движок, распределение и размер
+DEFAULT_DB = 'heapsort_history.sqlite'
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    git_commit TEXT NOT NULL,
+    dirty INTEGER NOT NULL,
+    label TEXT,
+    created TEXT NOT NULL,
+    environment TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    engine TEXT NOT NULL,
+    distribution TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    median_ns REAL NOT NULL,
+    min_ns REAL,
+    iqr_ns REAL,
+    iterations INTEGER,
+    samples TEXT NOT NULL,
+    PRIMARY KEY (run_id, engine, distribution, size)
+);
+'''
+
+
+def connect(db=DEFAULT_DB):
+    conn = sqlite3.connect(db)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+# текущий коммит и есть ли незакоммиченные изменения; вне git - 'unknown'
+def git_revision():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+        status = subprocess.run(['git', 'status', '--porcelain'], capture_output=True, text=True, check=True).stdout
+        return commit, bool(status.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown', False
+
+
+def record_results(results, db=DEFAULT_DB, label=None, commit=None):
+    dirty = False
+    if commit is None:
+        commit, dirty = git_revision()
+    with connect(db) as conn:
+        cur = conn.execute(
+            'INSERT INTO runs (git_commit, dirty, label, created, environment) VALUES (?, ?, ?, ?, ?)',
+            (commit, int(dirty), label, time.strftime('%Y-%m-%dT%H:%M:%S'), json.dumps(environment_info())))
+        run_id = cur.lastrowid
+        for r in results:
+            samples = r.get('_samples_ns') or [r['Время (сек)'] * 1e9]
+            iterations = r.get('Итерации')
+            conn.execute(
+                'INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (run_id, r.get('Алгоритм', 'heapSort'), r.get('Распределение', 'uniform'), r['Размер'],
+                 r['Время (сек)'] * 1e9, r.get('Мин (сек)', 0) * 1e9, r.get('IQR (сек)', 0) * 1e9,
+                 iterations if isinstance(iterations, int) else None, json.dumps(samples)))
+    print(f"Прогон #{run_id} ({commit[:10]}{' +изменения' if dirty else ''}) записан в {db}")
+    return run_id
+
+
+def list_runs(db=DEFAULT_DB):
+    with connect(db) as conn:
+        return conn.execute(
+            'SELECT r.id, r.git_commit, r.dirty, r.label, r.created, COUNT(x.size) '
+            'FROM runs r LEFT JOIN results x ON x.run_id = r.id GROUP BY r.id ORDER BY r.id').fetchall()
+
+
+# прогон можно указать номером, префиксом коммита (берется последний такой прогон)
+# или словами latest / previous
+def resolve_run(conn, ref):
+    if ref == 'latest':
+        row = conn.execute('SELECT id FROM runs ORDER BY id DESC LIMIT 1').fetchone()
+    elif ref == 'previous':
+        row = conn.execute('SELECT id FROM runs ORDER BY id DESC LIMIT 1 OFFSET 1').fetchone()
+    elif str(ref).isdigit():
+        row = conn.execute('SELECT id FROM runs WHERE id = ?', (int(ref),)).fetchone()
+    else:
+        row = conn.execute('SELECT id FROM runs WHERE git_commit LIKE ? ORDER BY id DESC LIMIT 1',
+                           (f'{ref}%',)).fetchone()
+    if row is None:
+        raise ValueError(f"Прогон не найден: {ref}")
+    return row[0]
+
+
+def load_run(conn, run_id):
+    rows = conn.execute('SELECT engine, distribution, size, median_ns, samples FROM results WHERE run_id = ?',
+                        (run_id,)).fetchall()
+    return {(e, d, s): (m, json.loads(samples)) for e, d, s, m, samples in rows}
+
+
+# двусторонний критерий Манна-Уитни (нормальное приближение с поправкой на связи).
+# на нескольких замерах это грубо, но не требует scipy и не верит в нормальность времени
+def mann_whitney_p(a, b):
+    n1, n2 = len(a), len(b)
+    if n1 < 2 or n2 < 2:
+        return 1.0
+    combined = sorted([(x, 0) for x in a] + [(x, 1) for x in b])
+    ranks = [0.0] * len(combined)
+    ties = 0.0
+    i = 0
+    while i < len(combined):
+        j = i
+        while j + 1 < len(combined) and combined[j + 1][0] == combined[i][0]:
+            j += 1
+        rank = (i + j) / 2 + 1
+        for t in range(i, j + 1):
+            ranks[t] = rank
+        count = j - i + 1
+        ties += count ** 3 - count
+        i = j + 1
+
+    r1 = sum(rank for rank, (_, group) in zip(ranks, combined) if group == 0)
+    u = r1 - n1 * (n1 + 1) / 2
+    n = n1 + n2
+    sigma = math.sqrt(n1 * n2 / 12 * ((n + 1) - ties / (n * (n - 1))))
+    if sigma == 0:
+        return 1.0
+    z = (abs(u - n1 * n2 / 2) - 0.5) / sigma
+    return math.erfc(max(z, 0.0) / math.sqrt(2))
+
+
+# сравнение двух прогонов: изменение медианы и значимость. регрессия - это
+# рост медианы больше threshold при p < alpha
+def compare_runs(old_ref, new_ref, db=DEFAULT_DB, alpha=0.05, threshold=0.05):
+    with connect(db) as conn:
+        old = load_run(conn, resolve_run(conn, old_ref))
+        new = load_run(conn, resolve_run(conn, new_ref))
+
+    rows = []
+    for key in sorted(old.keys() & new.keys()):
+        old_median, old_samples = old[key]
+        new_median, new_samples = new[key]
+        change = new_median / old_median - 1 if old_median else 0.0
+        p = mann_whitney_p(old_samples, new_samples)
+        if p < alpha and change > threshold:
+            verdict = 'РЕГРЕССИЯ'
+        elif p < alpha and change < -threshold:
+            verdict = 'ускорение'
+        else:
+            verdict = ''
+        rows.append({
+            'Алгоритм': key[0], 'Распределение': key[1], 'Размер': key[2],
+            'Было (сек)': old_median / 1e9, 'Стало (сек)': new_median / 1e9,
+            'Изменение': change, 'p': p, 'Итог': verdict,
+        })
+    return rows
+
+
+def print_comparison(rows):
+    from tabulate import tabulate
+
+    print(tabulate(
+        [(r['Алгоритм'], r['Распределение'], r['Размер'], f"{r['Было (сек)']:.6f}", f"{r['Стало (сек)']:.6f}",
+          f"{r['Изменение']:+.1%}", f"{r['p']:.3f}", r['Итог']) for r in rows],
+        headers=['Алгоритм', 'Распределение', 'Размер', 'Было (сек)', 'Стало (сек)', 'Изменение', 'p', 'Итог'],
+        tablefmt='grid'
+    ))
+    regressions = sum(r['Итог'] == 'РЕГРЕССИЯ' for r in rows)
+    print(f"Значимых регрессий: {regressions}")
+    return regressions
+
+
+# один график: линия на каждую пару (прогон, движок) для выбранного распределения
+def plot_history(run_refs, db=DEFAULT_DB, distribution='uniform', engines=None, filename='heapsort_history.png'):
+    import matplotlib.pyplot as plt
+
+    with connect(db) as conn:
+        plt.figure(figsize=(10, 6))
+        for ref in run_refs:
+            run_id = resolve_run(conn, ref)
+            commit, label = conn.execute('SELECT git_commit, label FROM runs WHERE id = ?', (run_id,)).fetchone()
+            name = label or commit[:8]
+            rows = conn.execute(
+                'SELECT engine, size, median_ns FROM results WHERE run_id = ? AND distribution = ? ORDER BY engine, size',
+                (run_id, distribution)).fetchall()
+            by_engine = {}
+            for engine, size, median in rows:
+                if engines is None or engine in engines:
+                    by_engine.setdefault(engine, []).append((size, median / 1e9))
+            for engine, points in by_engine.items():
+                plt.plot([p[0] for p in points], [p[1] for p in points], '-o', label=f'{engine} @ {name}')
+
+    plt.xlabel('Размер массива')
+    plt.ylabel('Медиана времени (сек)')
+    plt.title(f'Сравнение версий ({distribution})')
+    plt.legend()
+    plt.grid(True)
+    plt.tight_layout()
+    plt.savefig(filename)
+    print(f"График сохранен в файл {filename}")
+
+
+if __name__ == "__main__":
+    import sys
+    import argparse
+
+    parser = argparse.ArgumentParser(description="История замеров heapSort")
+    parser.add_argument('--db', default=DEFAULT_DB)
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('record', help="записать JSON из benchmark.py в историю")
+    p.add_argument('json_file')
+    p.add_argument('--label')
+
+    sub.add_parser('list', help="список прогонов")
+
+    p = sub.add_parser('compare', help="сравнить два прогона (номер, префикс коммита, latest, previous)")
+    p.add_argument('old', nargs='?', default='previous')
+    p.add_argument('new', nargs='?', default='latest')
+    p.add_argument('--alpha', type=float, default=0.05)
+    p.add_argument('--threshold', type=float, default=0.05)
+
+    p = sub.add_parser('plot', help="общий график нескольких прогонов")
+    p.add_argument('runs', nargs='+')
+    p.add_argument('--distribution', default='uniform')
+    p.add_argument('--engines', nargs='*')
+    p.add_argument('--output', default='heapsort_history.png')
+
+    args = parser.parse_args()
+
+    if args.command == 'record':
+        record_results(load_json(args.json_file)['results'], args.db, args.label)
+    elif args.command == 'list':
+        for run_id, commit, dirty, label, created, count in list_runs(args.db):
+            print(f"#{run_id}  {commit[:10]}{'+' if dirty else ' '}  {created}  {count:5d} строк  {label or ''}")
+    elif args.command == 'compare':
+        rows = compare_runs(args.old, args.new, args.db, args.alpha, args.threshold)
+        # ненулевой код выхода, если есть регрессии - удобно для CI
+        sys.exit(1 if print_comparison(rows) else 0)
+    elif args.command == 'plot':
+        plot_history(args.runs, args.db, args.distribution, args.engines, args.output)
@@ -0,0 +1,168 @@
+import gc
+import os
+import sys
+import json
+import time
+import platform
+import statistics
+import subprocess
+
+
+# один замер: make_input готовит свежий вход (вне таймера), func его сортирует.
+# сначала warmup прогонов вхолостую, потом repeats замеров через perf_counter_ns,
+# на время замера сборщик мусора выключен, чтобы его паузы не попадали в цифры
+def measure(func, make_input, repeats=5, warmup=1, disable_gc=True):
+    for _ in range(warmup):
+        func(make_input())
+
+    samples = []
+    result = None
+    gc_was_enabled = gc.isenabled()
+    try:
+        for _ in range(repeats):
+            arr = make_input()
+            gc.collect()
+            if disable_gc:
+                gc.disable()
+            start = time.perf_counter_ns()
+            result = func(arr)
+            end = time.perf_counter_ns()
+            if gc_was_enabled:
+                gc.enable()
+            samples.append(end - start)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    stats = summarize(samples)
+    stats['result'] = result
+    return stats
+
+
+# медиана, квартили, минимум - все в наносекундах
+def summarize(samples):
+    ordered = sorted(samples)
+    if len(ordered) > 1:
+        q1, median, q3 = statistics.quantiles(ordered, n=4, method='inclusive')
+    else:
+        q1 = median = q3 = ordered[0]
+    return {
+        'samples_ns': samples,
+        'median_ns': median,
+        'q1_ns': q1,
+        'q3_ns': q3,
+        'iqr_ns': q3 - q1,
+        'min_ns': ordered[0],
+    }
+
+
+# время импорта модуля в чистом интерпретаторе (каждый замер - отдельный процесс,
+# иначе второй импорт берется из sys.modules и ничего не стоит)
+def measure_import_time(module, repeats=5, cwd=None):
+    code = f"import time; t = time.perf_counter_ns(); import {module}; print(time.perf_counter_ns() - t)"
+    cwd = cwd or os.path.dirname(os.path.abspath(__file__))
+    samples = []
+    for _ in range(repeats):
+        out = subprocess.run([sys.executable, '-c', code], cwd=cwd, capture_output=True, text=True, check=True)
+        samples.append(int(out.stdout.strip().splitlines()[-1]))
+    return summarize(samples)
+
+
+# строки в формате run_tests для истории замеров: распределение 'import', размер 0
+def import_time_rows(modules=('sort_engine', 'heapsort', 'report'), repeats=5):
+    rows = []
+    for module in modules:
+        stats = measure_import_time(module, repeats)
+        rows.append({
+            'Алгоритм': f'import {module}',
+            'Распределение': 'import',
+            'Размер': 0,
+            'Время (сек)': stats['median_ns'] / 1e9,
+            'Мин (сек)': stats['min_ns'] / 1e9,
+            'IQR (сек)': stats['iqr_ns'] / 1e9,
+            'Итерации': None,
+            '_samples_ns': stats['samples_ns'],
+        })
+    return rows
+
+
+# привязка процесса к одному ядру, чтобы планировщик не гонял его между ядрами.
+# есть не везде (на Windows и macOS sched_setaffinity нет) - тогда просто предупреждаем
+def pin_cpu(cpu=0):
+    if not hasattr(os, 'sched_setaffinity'):
+        print("Привязка к ядру не поддерживается на этой платформе")
+        return False
+    os.sched_setaffinity(0, {cpu})
+    return True
+
+
+# пиковый RSS процесса в байтах (None, если модуля resource нет, как на Windows).
+# в отличие от tracemalloc ничего не замедляет, поэтому годится для всего прогона
+def peak_rss():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # linux отдает килобайты, macOS - байты
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def environment_info():
+    return {
+        'python': sys.version.split()[0],
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+# сохраняем результаты в JSON с отсортированными ключами и строкой на запись,
+# чтобы файлы разных версий нормально сравнивались обычным diff
+def save_json(results, filename='heapsort_results.json', config=None):
+    data = {
+        'environment': environment_info(),
+        'config': config or {},
+        'results': results,
+    }
+    with open(filename, 'w', encoding='utf-8') as f:
+        f.write('{\n')
+        f.write(f'"environment": {json.dumps(data["environment"], sort_keys=True, ensure_ascii=False)},\n')
+        f.write(f'"config": {json.dumps(data["config"], sort_keys=True, ensure_ascii=False)},\n')
+        f.write('"results": [\n')
+        f.write(',\n'.join(json.dumps(r, sort_keys=True, ensure_ascii=False) for r in results))
+        f.write('\n]\n}\n')
+    print(f"Результаты сохранены в файл {filename}")
+
+
+def load_json(filename):
+    with open(filename, encoding='utf-8') as f:
+        return json.load(f)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from heapsort import ENGINES, generate_test_data, run_tests
+    from report import print_results_table
+
+    parser = argparse.ArgumentParser(description="Замеры производительности heapSort")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeats', type=int, default=7)
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--pin', type=int, default=None, help="номер ядра для привязки процесса")
+    parser.add_argument('--json', default='heapsort_results.json')
+    args = parser.parse_args()
+
+    if args.pin is not None:
+        pin_cpu(args.pin)
+
+    results = run_tests(args.sizes, generate_test_data(args.sizes), ENGINES,
+                        repeats=args.repeats, warmup=args.warmup)
+    print_results_table(results)
+
+    import_rows = import_time_rows(repeats=args.repeats)
+    print_results_table(import_rows)
+    save_json(results + import_rows, args.json, config=vars(args))
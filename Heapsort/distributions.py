@@ -0,0 +1,123 @@
+from collections.abc import Mapping
+
+import numpy as np
+
+# генераторы входных данных разной формы. все векторные (numpy) и детерминированные:
+# один и тот же seed и размер дают один и тот же массив
+
+
+def uniform(rng, size):
+    return rng.integers(0, 10000, size, endpoint=True)
+
+
+def sorted_asc(rng, size):
+    return np.sort(uniform(rng, size))
+
+
+def sorted_desc(rng, size):
+    return sorted_asc(rng, size)[::-1].copy()
+
+
+# "органная труба": возрастает до середины, потом убывает
+def organ_pipe(rng, size):
+    half = size // 2
+    return np.concatenate([np.arange(half), np.arange(size - half)[::-1]])
+
+
+def few_unique(rng, size, unique=8):
+    return rng.integers(0, unique, size)
+
+
+def all_equal(rng, size):
+    return np.full(size, 42, dtype=np.int64)
+
+
+# пила: несколько одинаковых возрастающих отрезков подряд
+def sawtooth(rng, size, teeth=8):
+    return np.arange(size) % max(1, size // teeth)
+
+
+# сильно скошенное распределение: маленькие значения встречаются очень часто
+def zipf(rng, size, a=1.5):
+    return np.minimum(rng.zipf(a, size), 10 ** 9)
+
+
+# почти отсортированный: k случайных пар поменяны местами (по умолчанию 1% размера)
+def nearly_sorted(rng, size, k=None):
+    arr = np.arange(size)
+    if k is None:
+        k = max(1, size // 100)
+    k = min(k, size // 2)
+    pos = rng.choice(size, 2 * k, replace=False)
+    a, b = pos[:k], pos[k:]
+    arr[a], arr[b] = arr[b], arr[a].copy()
+    return arr
+
+
+def large_range(rng, size):
+    return rng.integers(np.iinfo(np.int64).min, np.iinfo(np.int64).max, size, dtype=np.int64, endpoint=True)
+
+
+def floats(rng, size):
+    return rng.random(size) * 10000
+
+
+DISTRIBUTIONS = {
+    'uniform': uniform,
+    'sorted': sorted_asc,
+    'reversed': sorted_desc,
+    'organ_pipe': organ_pipe,
+    'few_unique': few_unique,
+    'all_equal': all_equal,
+    'sawtooth': sawtooth,
+    'zipf': zipf,
+    'nearly_sorted': nearly_sorted,
+    'large_range': large_range,
+    'float': floats,
+}
+
+
+# генератор свой на каждый размер, так что массив для размера не зависит от того,
+# какие еще размеры генерировались. seed=None - каждый раз случайные данные
+def make_rng(seed, size):
+    return np.random.default_rng(None if seed is None else [seed, size])
+
+
+def generate_array(distribution, size, seed=None):
+    if distribution not in DISTRIBUTIONS:
+        raise ValueError(f"Неизвестное распределение: {distribution}. Есть: {', '.join(DISTRIBUTIONS)}")
+    return DISTRIBUTIONS[distribution](make_rng(seed, size), size)
+
+
+def generate_list(distribution, size, seed=None):
+    return generate_array(distribution, size, seed).tolist()
+
+
+# ленивый набор тестовых данных {размер: список}. массив генерируется при первом
+# обращении к размеру и держится в памяти только один - последний запрошенный,
+# так что пик памяти O(максимального размера), а не O(суммы размеров)
+class LazyTestData(Mapping):
+    def __init__(self, sizes, distribution='uniform', seed=None):
+        if distribution not in DISTRIBUTIONS:
+            raise ValueError(f"Неизвестное распределение: {distribution}. Есть: {', '.join(DISTRIBUTIONS)}")
+        self.sizes = list(sizes)
+        self.distribution = distribution
+        # без seed все равно фиксируем случайный, чтобы повторный запрос размера давал те же данные
+        self.seed = seed if seed is not None else int(np.random.SeedSequence().entropy % 2 ** 32)
+        self._size = None
+        self._data = None
+
+    def __getitem__(self, size):
+        if size not in self.sizes:
+            raise KeyError(size)
+        if size != self._size:
+            self._data = None  # отпускаем старый массив до генерации нового
+            self._data = generate_list(self.distribution, size, self.seed)
+            self._size = size
+        return self._data
+
+    def __iter__(self):
+        return iter(self.sizes)
+
+    def __len__(self):
+        return len(self.sizes)
@@ -0,0 +1,142 @@
+import os
+import mmap
+import tempfile
+from array import array
+
+from sort_engine import heapSortFloyd, heapify_keyed
+
+# все числа на диске лежат в одном формате: знаковые 64-битные, порядок байт машины
+TYPECODE = 'q'
+ITEM_SIZE = array(TYPECODE).itemsize
+# сколько чисел читаем/пишем за один раз при слиянии
+MERGE_BLOCK = 64 * 1024
+
+
+# источник - путь к бинарному файлу int64 или любой iterable с целыми числами.
+# отдаем его кусками не больше run_size элементов
+def _read_chunks(source, run_size):
+    if isinstance(source, (str, bytes, os.PathLike)):
+        with open(source, 'rb') as f:
+            while True:
+                chunk = array(TYPECODE)
+                try:
+                    chunk.fromfile(f, run_size)
+                except EOFError:
+                    pass  # последний кусок неполный - fromfile все равно дочитал что было
+                if not chunk:
+                    return
+                yield chunk
+    else:
+        chunk = array(TYPECODE)
+        for x in source:
+            chunk.append(x)
+            if len(chunk) == run_size:
+                yield chunk
+                chunk = array(TYPECODE)
+        if chunk:
+            yield chunk
+
+
+# фаза 1: режем вход на серии по memory_limit байт, каждую сортируем кучей
+# и сбрасываем во временный файл
+def make_runs(source, tmp_dir, memory_limit):
+    run_size = max(1, memory_limit // ITEM_SIZE)
+    run_paths = []
+    for chunk in _read_chunks(source, run_size):
+        heapSortFloyd(chunk)
+        fd, path = tempfile.mkstemp(prefix='run_', suffix='.bin', dir=tmp_dir)
+        with os.fdopen(fd, 'wb') as f:
+            chunk.tofile(f)
+        run_paths.append(path)
+    return run_paths
+
+
+# k-путевое слияние отсортированных последовательностей (memoryview, array, list)
+# через min-кучу курсоров. отдаем результат блоками по block элементов.
+# нужно только внешней сортировке: parallel_sort раньше тоже сливал им куски в родителе,
+# но теперь делит данные разделителями, и сливать там нечего
+def kway_merge(views, iterations, block=MERGE_BLOCK, typecode=TYPECODE):
+    views = [v for v in views if len(v)]
+    # в куче лежат текущие головы серий, рядом - номер серии и позиция в ней
+    keys = [v[0] for v in views]
+    cursors = [[j, 0] for j in range(len(views))]
+    n = len(keys)
+    for i in range(n // 2 - 1, -1, -1):
+        heapify_keyed(keys, cursors, n, i, iterations, reverse=True)
+
+    out = array(typecode)
+    while n:
+        out.append(keys[0])
+        cursor = cursors[0]
+        cursor[1] += 1
+        view = views[cursor[0]]
+        if cursor[1] < len(view):
+            keys[0] = view[cursor[1]]
+        else:
+            # серия закончилась - ставим на ее место последний элемент кучи
+            n -= 1
+            keys[0] = keys[n]
+            cursors[0] = cursors[n]
+            keys.pop()
+            cursors.pop()
+        heapify_keyed(keys, cursors, n, 0, iterations, reverse=True)
+
+        if len(out) >= block:
+            yield out
+            out = array(typecode)
+    if out:
+        yield out
+
+
+# фаза 2: сливаем серии. файлы открываем через mmap, так что читает их ОС, а не мы
+def merge_runs(run_paths, output_path):
+    maps = []
+    views = []
+    iterations = [0]
+    try:
+        for path in run_paths:
+            if os.path.getsize(path) == 0:
+                continue
+            with open(path, 'rb') as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            maps.append(mm)
+            views.append(memoryview(mm).cast(TYPECODE))
+
+        with open(output_path, 'wb') as f:
+            for out in kway_merge(views, iterations):
+                out.tofile(f)
+        return iterations[0]
+    finally:
+        for view in views:
+            view.release()
+        for mm in maps:
+            mm.close()
+
+
+# внешняя сортировка для данных, которые не влезают в память.
+# результат - бинарный файл int64 в output_path
+def external_heap_sort(source, output_path, memory_limit=256 * 1024 * 1024, tmp_dir=None):
+    with tempfile.TemporaryDirectory(dir=tmp_dir) as run_dir:
+        run_paths = make_runs(source, run_dir, memory_limit)
+        return merge_runs(run_paths, output_path)
+
+
+def read_sorted(path):
+    result = array(TYPECODE)
+    with open(path, 'rb') as f:
+        result.frombytes(f.read())
+    return result
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    if len(sys.argv) < 3:
+        print("Использование: python external_sort.py <вход.bin> <выход.bin> [лимит памяти, МБ]")
+        sys.exit(1)
+
+    limit = int(sys.argv[3]) * 1024 * 1024 if len(sys.argv) > 3 else 256 * 1024 * 1024
+    start_time = time.time()
+    external_heap_sort(sys.argv[1], sys.argv[2], memory_limit=limit)
+    print(f"Отсортировано за {time.time() - start_time:.2f} сек, результат в {sys.argv[2]}")
@@ -1,120 +1,307 @@
-import time
-import random
-import matplotlib.pyplot as plt
-import pandas as pd
-from tabulate import tabulate  #используется для красивого вывода таблички значений
+import heapq
+import tracemalloc
 
+from sort_engine import (
+    heapify, heapify_keyed, heapify_dary, heapify_instrumented, build_heap_blocked,
+    heapSort, heapSortFloyd, heapSortNumpy, heapSortRecords, hybridSort, heap_topk, heap_partial_sort, heap_merge,
+    sift_down_floyd, sift_down_floyd_counted, HeapStats,
+    BUILD_BLOCK, BUILD_STRATEGIES, NUMPY_DTYPES, NUMPY_BATCH_MIN, SMALL_SORT, QUICK_CUTOFF, MERGE_READ_BLOCK,
+)
+from benchmark import measure, save_json, peak_rss, import_time_rows
 
-def heapify(arr, n, i, iterations):
-    largest = i
-    left = 2 * i + 1
-    right = 2 * i + 2
+# замеры производительности движков из sort_engine. отчеты (таблицы, графики, Excel)
+# лежат в report.py и подгружаются только при первом обращении, см. __getattr__ ниже
+REPORT_FUNCTIONS = ('print_results_table', 'print_partial_table', 'plot_performance', 'save_to_excel')
 
-    iterations[0] += 1
-    if left < n and arr[i] < arr[left]:
-        largest = left
 
-    iterations[0] += 1
-    if right < n and arr[largest] < arr[right]:
-        largest = right
+def __getattr__(name):
+    if name in REPORT_FUNCTIONS:
+        import report
+        return getattr(report, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-    if largest != i:
-        arr[i], arr[largest] = arr[largest], arr[i]
-        heapify(arr, n, largest, iterations)
 
+# обертка для run_tests: тот получает обычные списки. heapSortNumpy считает сравнения,
+# а не итерации heapSort, поэтому они идут в отдельную колонку
+def _numpy_engine(arr):
+    import numpy as np
 
-def heapSort(arr):
-    iterations = [0]
-    n = len(arr)
+    a = np.array(arr)
+    comparisons = heapSortNumpy(a)
+    arr[:] = a.tolist()
+    return {'Итерации': None, 'Сравнения (Флойд)': comparisons}
 
-    for i in range(n // 2 - 1, -1, -1):
-        heapify(arr, n, i, iterations)
 
-    for i in range(n - 1, 0, -1):
-        arr[i], arr[0] = arr[0], arr[i]
-        heapify(arr, i, 0, iterations)
+# арности, которые перебирает сравнение d-арных куч
+ARITIES = (2, 3, 4, 8)
+ARITY_ENGINES = {f'heapSort d={d}': (lambda arr, d=d: heapSort(arr, d=d)) for d in ARITIES}
 
-    return iterations[0]
+BUILD_ENGINES = {f'heapSort build={b}': (lambda arr, b=b: heapSort(arr, build=b)) for b in BUILD_STRATEGIES}
 
 
-def generate_test_data(sizes):
-    return {size: [random.randint(0, 10000) for _ in range(size)] for size in sizes}
+def _stable_engine(arr):
+    info = {}
+    iterations = heapSort(arr, stable=True, info=info)
+    return {'Итерации': iterations, 'Доп. память (байт)': info['extra_memory']}
 
 
-def run_tests(sizes, test_data):
-    results = []
+def _hybrid_engine(arr):
+    info = {}
+    iterations = hybridSort(arr, info=info)
+    return {'Итерации': iterations, 'Путь': info['path']}
+
+
+# под таймером - без tracemalloc, иначе время было бы раз в десять больше настоящего
+def _stats_engine(arr):
+    stats = HeapStats(track_memory=False)
+    iterations = heapSort(arr, stats=stats)
+    row = stats.as_row()
+    row['Итерации'] = iterations
+    return row
+
+
+# пик памяти - отдельным вызовом вне замера, см. run_tests
+def _stats_memory(arr):
+    stats = HeapStats()
+    heapSort(arr, stats=stats)
+    return {'Пик памяти (байт)': stats.peak_memory}
+
+
+_stats_engine.untimed = _stats_memory
+
+
+# движки, которые гоняет run_tests; значение - функция, сортирующая массив на месте
+# и возвращающая количество итераций (или None, если счет выключен).
+# у функции может быть атрибут untimed - см. run_tests
+ENGINES = {
+    'heapSort': heapSort,
+    'heapSortFloyd': lambda arr: heapSortFloyd(arr, count=True),
+    'heapSortNumpy': _numpy_engine,
+    'heapSort stable': _stable_engine,
+    'hybridSort': _hybrid_engine,
+    'heapSort stats': _stats_engine,
+}
+
+
+# distribution - одна из форм из distributions.DISTRIBUTIONS, seed делает данные воспроизводимыми.
+# массивы создаются лениво при обращении к размеру, см. LazyTestData
+def generate_test_data(sizes, distribution='uniform', seed=None):
+    from distributions import LazyTestData
+
+    return LazyTestData(sizes, distribution, seed)
+
+
+# сколько памяти съедает сама подготовка данных в run_tests (генерация + копия на прогон),
+# без сортировки. для ленивых данных это O(максимального размера)
+def measure_data_memory(sizes, test_data):
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
     for size in sizes:
         arr = test_data[size].copy()
+        del arr
+    peak = tracemalloc.get_traced_memory()[1] - base
+    if started:
+        tracemalloc.stop()
+    return peak
+
+
+# каждый движок на каждом размере прогоняется warmup раз вхолостую и repeats раз под таймером.
+# в 'Время (сек)' - медиана, рядом минимум и межквартильный размах; сырые замеры
+# лежат в '_samples_ns' (колонки с подчеркиванием в таблицу и Excel не попадают).
+# если у движка есть атрибут untimed, он вызывается один раз на свежей копии уже после
+# замеров, и его словарь дописывается в строку - так собирают то, что мешало бы таймеру
+def run_tests(sizes, test_data, engines=None, repeats=5, warmup=1):
+    if engines is None:
+        engines = {'heapSort': heapSort}
+
+    results = []
+    for size in sizes:
+        for name, sort_func in engines.items():
+            stats = measure(sort_func, lambda: test_data[size].copy(), repeats=repeats, warmup=warmup)
+            iterations = stats['result']
+
+            row = {
+                'Алгоритм': name,
+                'Размер': size,
+                'Время (сек)': stats['median_ns'] / 1e9,
+                'Мин (сек)': stats['min_ns'] / 1e9,
+                'IQR (сек)': stats['iqr_ns'] / 1e9,
+                '_samples_ns': stats['samples_ns'],
+            }
+            # движок может вернуть словарь с дополнительными колонками вместо числа итераций
+            if isinstance(iterations, dict):
+                row.update(iterations)
+            else:
+                row['Итерации'] = iterations
+            untimed = getattr(sort_func, 'untimed', None)
+            if untimed is not None:
+                row.update(untimed(test_data[size].copy()))
+            results.append(row)
+    return results
+
 
-        start_time = time.time()
-        iterations = heapSort(arr)
-        end_time = time.time()
+# прогоняем движки на всех формах входных данных; в строках появляется колонка 'Распределение'
+def run_distribution_tests(sizes, engines=None, distributions=None, seed=0, repeats=5, warmup=1):
+    from distributions import DISTRIBUTIONS
 
-        results.append({
-            'Размер': size,
-            'Время (сек)': end_time - start_time,
-            'Итерации': iterations
-        })
+    results = []
+    for name in distributions or DISTRIBUTIONS:
+        test_data = generate_test_data(sizes, name, seed)
+        for row in run_tests(sizes, test_data, engines, repeats, warmup):
+            row['Распределение'] = name
+            results.append(row)
     return results
 
 
-def print_results_table(results):
-    print(tabulate(
-        [(r['Размер'], f"{r['Время (сек)']:.6f}", r['Итерации']) for r in results],
-        headers=['Размер', 'Время (сек)', 'Итерации'],
-        tablefmt='grid'
-    ))
+# слияние fan_in отсортированных потоков общей длиной total: heap_merge против heapq.merge
+# и против "склеить все и отсортировать heapSort"
+def run_merge_tests(total=100000, fan_ins=(2, 8, 64, 512), seed=0, repeats=5, warmup=1):
+    from distributions import generate_list
 
+    data = generate_list('uniform', total, seed)
+    engines = {
+        'heap_merge': lambda streams: sum(1 for _ in heap_merge(*map(iter, streams))),
+        'heapq.merge': lambda streams: sum(1 for _ in heapq.merge(*map(iter, streams))),
+        'concat + heapSort': lambda streams: heapSort([x for s in streams for x in s]),
+    }
 
-def plot_performance(results):
-    sizes = [r['Размер'] for r in results]
-    times = [r['Время (сек)'] for r in results]
-    iterations = [r['Итерации'] for r in results]
+    results = []
+    for fan_in in fan_ins:
+        streams = [sorted(data[i::fan_in]) for i in range(fan_in)]
+        for name, merge_func in engines.items():
+            stats = measure(merge_func, lambda: streams, repeats=repeats, warmup=warmup)
+            results.append({
+                'Алгоритм': name,
+                'Размер': total,
+                'Время (сек)': stats['median_ns'] / 1e9,
+                'Итерации': None,
+                'Fan-in': fan_in,
+                'Мин (сек)': stats['min_ns'] / 1e9,
+                'IQR (сек)': stats['iqr_ns'] / 1e9,
+                '_samples_ns': stats['samples_ns'],
+            })
+    return results
 
-    plt.figure(figsize=(14, 6))
 
-    plt.subplot(1, 2, 1)
-    plt.plot(sizes, times, 'b-o')
-    plt.xlabel('Размер массива')
-    plt.ylabel('Время выполнения (сек)')
-    plt.title('Зависимость времени выполнения от размера массива')
-    plt.grid(True)
+# записи (priority, timestamp, id): список кортежей + heapSort против колонок + heapSortRecords.
+# кроме времени пишем пик памяти tracemalloc на саму сортировку
+def run_records_tests(sizes=(10000, 100000), seed=0, repeats=5, warmup=1):
+    import numpy as np
 
-    plt.subplot(1, 2, 2)
-    plt.plot(sizes, iterations, 'r-o')
-    plt.xlabel('Размер массива')
-    plt.ylabel('Количество итераций')
-    plt.title('Зависимость итераций от размера массива')
-    plt.grid(True)
+    engines = {
+        'heapSort (кортежи)': lambda cols: heapSort(list(zip(*(c.tolist() for c in cols)))),
+        'heapSortRecords': lambda cols: heapSortRecords(cols, return_perm=True),
+    }
+
+    results = []
+    for size in sizes:
+        rng = np.random.default_rng([seed, size])
+        columns = (rng.integers(0, 10, size), rng.integers(0, 10 ** 12, size), np.arange(size))
+        for name, sort_func in engines.items():
+            stats = measure(sort_func, lambda: columns, repeats=repeats, warmup=warmup)
+
+            tracemalloc.start()
+            sort_func(columns)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            results.append({
+                'Алгоритм': name,
+                'Размер': size,
+                'Время (сек)': stats['median_ns'] / 1e9,
+                'Итерации': None,
+                'Пик памяти (байт)': peak,
+                'Мин (сек)': stats['min_ns'] / 1e9,
+                'IQR (сек)': stats['iqr_ns'] / 1e9,
+                '_samples_ns': stats['samples_ns'],
+            })
+    return results
 
-    plt.tight_layout()
-    plt.savefig('heapsort_performance.png')
-    plt.show()
 
-# необходимо также импортировать модуль openpyxl, чтобы посмотреть таблицу значений в ексель
-def save_to_excel(results, filename='heapsort_results.xlsx'):
-    df = pd.DataFrame(results)
-    df.to_excel(filename, index=False)
-    print(f"Результаты сохранены в файл {filename}")
+# сравниваем частичную сортировку и top-k с полной сортировкой для разных k/n
+def run_partial_tests(sizes, test_data, ratios=(0.001, 0.01, 0.1, 0.5), repeats=5, warmup=1):
+    results = []
+    for size in sizes:
+        full_time = measure(heapSort, lambda: test_data[size].copy(), repeats, warmup)['median_ns'] / 1e9
+
+        for ratio in ratios:
+            k = max(1, int(size * ratio))
+
+            partial = measure(lambda arr: heap_partial_sort(arr, k), lambda: test_data[size].copy(), repeats, warmup)
+            topk = measure(lambda arr: heap_topk(iter(arr), k), lambda: test_data[size], repeats, warmup)
+            partial_time = partial['median_ns'] / 1e9
+
+            results.append({
+                'Размер': size,
+                'k': k,
+                'Полная (сек)': full_time,
+                'Частичная (сек)': partial_time,
+                'top-k (сек)': topk['median_ns'] / 1e9,
+                'Итерации': partial['result'],
+                'Ускорение': full_time / partial_time if partial_time else float('inf'),
+            })
+    return results
 
 
 if __name__ == "__main__":
+    from report import print_results_table, print_partial_table, plot_performance, save_to_excel
+    from bench_history import record_results
+
     sizes = list(range(100, 10001, 200))
 
     print("1. Генерация тестовых данных...")
     test_data = generate_test_data(sizes)
 
     print("\n2. Запуск тестов производительности...")
-    results = run_tests(sizes, test_data)
+    results = run_tests(sizes, test_data, ENGINES)
+    print(f"   Память на тестовые данные: {measure_data_memory(sizes, test_data)} байт "
+          f"(максимальный размер - {max(sizes)} элементов, всего элементов - {sum(sizes)})")
+    rss = peak_rss()
+    if rss is not None:
+        print(f"   Пиковая память процесса: {rss / 2 ** 20:.1f} МБ")
 
     print("\n3. Результаты в табличном виде:")
     print_results_table(results)
 
+    print("\n   Частичная сортировка и top-k против полной:")
+    print_partial_table(run_partial_tests(sizes[::10], test_data))
+
+    print("\n   Сравнение арности кучи:")
+    print_results_table(run_tests(sizes[::10], test_data, ARITY_ENGINES))
+
+    print("\n   Сравнение способов построения кучи:")
+    print_results_table(run_tests(sizes[::10], test_data, BUILD_ENGINES))
+
+    print("\n   Гибридная сортировка на маленьких и готовых массивах:")
+    small_sizes = [8, 16, 32, 64, 128, 256]
+    small_data = generate_test_data(small_sizes)
+    hybrid_engines = {'heapSort': heapSort, 'hybridSort': _hybrid_engine}
+    print_results_table(run_tests(small_sizes, small_data, hybrid_engines))
+    print_results_table(run_tests(small_sizes, {s: sorted(a) for s, a in small_data.items()}, hybrid_engines))
+
+    print("\n   Движки на разных формах входных данных:")
+    print_results_table(run_distribution_tests([sizes[-1]], ENGINES))
+
+    print("\n   Слияние отсортированных потоков:")
+    print_results_table(run_merge_tests())
+
+    print("\n   Сортировка записей по нескольким колонкам:")
+    print_results_table(run_records_tests())
+
+    print("\n   Время импорта модулей:")
+    import_rows = import_time_rows()
+    print_results_table(import_rows)
+
     print("\n4. Построение графиков...")
     plot_performance(results)
 
-    print("\n5. Сохранение результатов в Excel...")
+    print("\n5. Сохранение результатов в Excel, JSON и историю замеров...")
     save_to_excel(results)
+    save_json(results, config={'sizes': sizes, 'repeats': 5, 'warmup': 1})
+    record_results(results + import_rows)
 
     print("\nТестирование завершено!")
     print("Графики сохранены в файл heapsort_performance.png")
\ No newline at end of file
@@ -0,0 +1,165 @@
+import os
+import random
+from array import array
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from sort_engine import heapSortFloyd
+
+# сколько элементов выборки на одного воркера при выборе разделителей. выборка не зависит
+# от числа корзин: ее сортирует родитель, пока воркеры ждут, так что она должна быть маленькой
+SAMPLE_PER_WORKER = 256
+# кусками такого размера копируем список в общую память, без полной копии массива
+COPY_BLOCK = 1 << 16
+# тип номеров корзин в общей памяти
+BUCKET_TYPECODE = 'I'
+
+
+# цепляемся к общей памяти по имени и смотрим на нее как на массив typecode длины n
+@contextmanager
+def _attached(name, n, typecode):
+    shm = shared_memory.SharedMemory(name=name)
+    view = shm.buf[:n * array(typecode).itemsize].cast(typecode)
+    try:
+        yield view
+    finally:
+        view.release()
+        shm.close()
+
+
+# шаг 1: для каждого элемента куска [lo, hi) - номер корзины. разделители - пары
+# (значение, позиция), так что одинаковые значения тоже делятся между корзинами по позиции
+# и длинная серия повторов не достается целиком одному воркеру. номера пишем в общую
+# память, возвращаем размеры корзин в этом куске
+def _count_chunk(src_name, ids_name, n, typecode, split_values, split_positions, lo, hi):
+    ties = set(split_values)
+    with _attached(src_name, n, typecode) as src, _attached(ids_name, n, BUCKET_TYPECODE) as ids:
+        chunk = src[lo:hi]
+        buckets = array(BUCKET_TYPECODE, map(partial(bisect_right, split_values), chunk))
+        # позиция нужна только элементам, равным какому-то разделителю; среди разделителей
+        # с тем же значением позиции идут по возрастанию
+        for i in [i for i, x in enumerate(chunk) if x in ties]:
+            last = buckets[i]
+            first = bisect_left(split_values, chunk[i], 0, last)
+            buckets[i] = bisect_right(split_positions, lo + i, first, last)
+        chunk.release()
+        ids[lo:hi] = buckets
+    counts = [0] * (len(split_values) + 1)
+    for b in buckets:
+        counts[b] += 1
+    return counts
+
+
+# шаг 2: раскладываем кусок [lo, hi) по корзинам выходного массива. offsets - куда в каждой
+# корзине пишет этот кусок; места разных кусков не пересекаются, поэтому без блокировок
+def _scatter_chunk(src_name, ids_name, dst_name, n, typecode, lo, hi, offsets):
+    with _attached(src_name, n, typecode) as src, _attached(ids_name, n, BUCKET_TYPECODE) as ids, \
+            _attached(dst_name, n, typecode) as dst:
+        chunk, chunk_ids = src[lo:hi], ids[lo:hi]
+        for x, b in zip(chunk, chunk_ids):
+            pos = offsets[b]
+            dst[pos] = x
+            offsets[b] = pos + 1
+        chunk.release()
+        chunk_ids.release()
+
+
+# шаг 3: сортируем корзину [lo, hi) прямо на ее месте в выходном массиве
+def _sort_chunk(dst_name, n, typecode, lo, hi):
+    with _attached(dst_name, n, typecode) as dst:
+        chunk = dst[lo:hi]
+        comparisons = heapSortFloyd(chunk, count=True)
+        chunk.release()
+    return comparisons
+
+
+# многопроцессный heapSort как сортировка выборкой (sample sort): по случайной выборке пар
+# (значение, позиция) выбираем разделители, воркеры раскладывают свои куски по корзинам,
+# и каждая корзина сортируется отдельной задачей сразу на свое место. последовательного
+# слияния в родителе нет (поэтому и external_sort.kway_merge здесь не нужен). chunk_size -
+# примерный размер корзины, то есть сколько сортирует одна задача (по умолчанию - по одной
+# корзине на воркера); корзин не больше, чем элементов в выборке. сортирует arr на месте и,
+# как heapSort, возвращает число итераций: сравнения во всех задачах плюс оценка
+# сравнений при раскладке (двоичный поиск корзины)
+def parallel_heap_sort(arr, workers=None, chunk_size=None, typecode='q'):
+    n = len(arr)
+    if n < 2:
+        return 0
+
+    workers = workers or os.cpu_count() or 1
+    # куски входа для раскладки - по одному на воркера, а число корзин задает chunk_size
+    step = -(-n // workers)
+    bounds = [(lo, min(lo + step, n)) for lo in range(0, n, step)]
+    sample_size = min(n, workers * SAMPLE_PER_WORKER)
+    buckets = min(-(-n // chunk_size) if chunk_size else len(bounds), sample_size)
+
+    positions = random.sample(range(n), sample_size)
+    sample = sorted((arr[i], i) for i in positions)
+    splitters = [sample[len(sample) * b // buckets] for b in range(1, buckets)]
+    split_values = [value for value, _ in splitters]
+    split_positions = [position for _, position in splitters]
+
+    itemsize = array(typecode).itemsize
+    src = shared_memory.SharedMemory(create=True, size=n * itemsize)
+    dst = shared_memory.SharedMemory(create=True, size=n * itemsize)
+    ids = shared_memory.SharedMemory(create=True, size=n * array(BUCKET_TYPECODE).itemsize)
+    try:
+        with _attached(src.name, n, typecode) as view:
+            if isinstance(arr, array) and arr.typecode == typecode:
+                view[:] = memoryview(arr)
+            else:
+                for lo in range(0, n, COPY_BLOCK):
+                    view[lo:lo + COPY_BLOCK] = array(typecode, arr[lo:lo + COPY_BLOCK])
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_count_chunk, src.name, ids.name, n, typecode, split_values, split_positions, lo, hi)
+                       for lo, hi in bounds]
+            counts = [f.result() for f in futures]
+
+            # начало каждой корзины и место каждого куска внутри нее
+            starts = []
+            offsets = [[0] * buckets for _ in bounds]
+            pos = 0
+            for b in range(buckets):
+                starts.append(pos)
+                for c in range(len(bounds)):
+                    offsets[c][b] = pos
+                    pos += counts[c][b]
+            starts.append(n)
+
+            futures = [pool.submit(_scatter_chunk, src.name, ids.name, dst.name, n, typecode, lo, hi, offsets[c])
+                       for c, (lo, hi) in enumerate(bounds)]
+            for f in futures:
+                f.result()
+
+            futures = [pool.submit(_sort_chunk, dst.name, n, typecode, starts[b], starts[b + 1])
+                       for b in range(buckets) if starts[b + 1] - starts[b] > 1]
+            iterations = sum(f.result() for f in futures) + n * len(splitters).bit_length()
+
+        with _attached(dst.name, n, typecode) as view:
+            if isinstance(arr, array) and arr.typecode == typecode:
+                memoryview(arr)[:] = view
+            else:
+                arr[:] = view
+        return iterations
+    finally:
+        for shm in (src, dst, ids):
+            shm.close()
+            shm.unlink()
+
+
+if __name__ == "__main__":
+    from heapsort import generate_test_data, run_tests
+    from report import print_results_table
+
+    sizes = [100000, 500000, 1000000]
+    test_data = generate_test_data(sizes)
+
+    engines = {'heapSortFloyd': lambda a: heapSortFloyd(a, count=True)}
+    for w in sorted({1, 2, 4, os.cpu_count() or 1}):
+        engines[f'parallel x{w}'] = lambda a, w=w: parallel_heap_sort(a, workers=w)
+
+    print_results_table(run_tests(sizes, test_data, engines))
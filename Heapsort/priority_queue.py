@@ -0,0 +1,202 @@
+from array import array
+
+# очередь с приоритетами на min-куче с изменением ключа. у каждого элемента есть
+# handle (целое число), через индекс позиций pos[handle] мы за O(1) находим его в куче,
+# поэтому decrease/increase-key и удаление - O(log n), в отличие от heapq.
+# просеивание вниз - тот же прием Флойда, что в sort_engine.sift_down_floyd: "дырка" без
+# сравнений с самим элементом спускается до листа, а элемент потом поднимается от листа
+# на свое место. отличия - min-куча и обновление позиций сдвинутых элементов; код отдельный,
+# потому что общий sift с вызовом функции-хука на каждом шаге съел бы весь выигрыш
+
+
+class HeapPQ:
+    __slots__ = ('_keys', '_handles', '_pos', '_items', '_free')
+
+    # typecode массива приоритетов: 'd' - float64, 'q' - int64
+    def __init__(self, typecode='d'):
+        self._keys = array(typecode)    # приоритеты в порядке кучи
+        self._handles = array('q')      # слот кучи -> handle
+        self._pos = array('q')          # handle -> слот кучи (-1, если handle свободен)
+        self._items = []                # handle -> элемент
+        self._free = []                 # освободившиеся handle для повторного использования
+
+    # построение за O(n) из пар (элемент, приоритет); handle i у i-й пары
+    @classmethod
+    def from_iterable(cls, pairs, typecode='d'):
+        pq = cls(typecode)
+        for item, priority in pairs:
+            pq._items.append(item)
+            pq._keys.append(priority)
+        n = len(pq._items)
+        pq._handles = array('q', range(n))
+        pq._pos = array('q', range(n))
+        for i in range(n // 2 - 1, -1, -1):
+            pq._sift_down(i)
+        return pq
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __bool__(self):
+        return len(self._keys) > 0
+
+    def __contains__(self, handle):
+        return 0 <= handle < len(self._pos) and self._pos[handle] >= 0
+
+    def _sift_down(self, i):
+        keys, handles, pos = self._keys, self._handles, self._pos
+        n = len(keys)
+        key = keys[i]
+        handle = handles[i]
+        start = i
+        child = 2 * i + 1
+        while child < n:
+            right = child + 1
+            if right < n and keys[right] < keys[child]:
+                child = right
+            keys[i] = keys[child]
+            moved = handles[child]
+            handles[i] = moved
+            pos[moved] = i
+            i = child
+            child = 2 * i + 1
+        keys[i] = key
+        handles[i] = handle
+        self._sift_up(i, start)
+
+    # поднимаем элемент из слота i, но не выше слота top
+    def _sift_up(self, i, top=0):
+        keys, handles, pos = self._keys, self._handles, self._pos
+        key = keys[i]
+        handle = handles[i]
+        while i > top:
+            parent = (i - 1) >> 1
+            if not key < keys[parent]:
+                break
+            keys[i] = keys[parent]
+            moved = handles[parent]
+            handles[i] = moved
+            pos[moved] = i
+            i = parent
+        keys[i] = key
+        handles[i] = handle
+        pos[handle] = i
+
+    def _check(self, handle):
+        if handle not in self:
+            raise KeyError(f"Нет элемента с handle {handle}")
+        return self._pos[handle]
+
+    def push(self, item, priority):
+        if self._free:
+            handle = self._free.pop()
+            self._items[handle] = item
+        else:
+            handle = len(self._items)
+            self._items.append(item)
+            self._pos.append(-1)
+        self._keys.append(priority)
+        self._handles.append(handle)
+        self._sift_up(len(self._keys) - 1)
+        return handle
+
+    def peek(self):
+        if not self._keys:
+            raise IndexError("peek из пустой очереди")
+        return self._items[self._handles[0]], self._keys[0]
+
+    def pop(self):
+        if not self._keys:
+            raise IndexError("pop из пустой очереди")
+        return self._remove_at(0)
+
+    def remove(self, handle):
+        return self._remove_at(self._check(handle))
+
+    # на место удаляемого ставим последний элемент кучи и просеиваем его в нужную сторону
+    def _remove_at(self, i):
+        keys, handles = self._keys, self._handles
+        handle = handles[i]
+        item, priority = self._items[handle], keys[i]
+
+        last_key = keys.pop()
+        last_handle = handles.pop()
+        if i < len(keys):
+            keys[i] = last_key
+            handles[i] = last_handle
+            self._pos[last_handle] = i
+            if i > 0 and last_key < keys[(i - 1) >> 1]:
+                self._sift_up(i)
+            else:
+                self._sift_down(i)
+
+        self._pos[handle] = -1
+        self._items[handle] = None
+        self._free.append(handle)
+        return item, priority
+
+    def priority(self, handle):
+        return self._keys[self._check(handle)]
+
+    def item(self, handle):
+        self._check(handle)
+        return self._items[handle]
+
+    # смена приоритета в любую сторону
+    def update(self, handle, priority):
+        i = self._check(handle)
+        old = self._keys[i]
+        self._keys[i] = priority
+        if priority < old:
+            self._sift_up(i)
+        elif old < priority:
+            self._sift_down(i)
+
+    def decrease_key(self, handle, priority):
+        if self.priority(handle) < priority:
+            raise ValueError("decrease_key: новый приоритет больше текущего")
+        self.update(handle, priority)
+
+    def increase_key(self, handle, priority):
+        if priority < self.priority(handle):
+            raise ValueError("increase_key: новый приоритет меньше текущего")
+        self.update(handle, priority)
+
+
+if __name__ == "__main__":
+    import heapq
+    import random
+    import time
+
+    # нагрузка как у планировщика: много вставок, еще больше уменьшений ключа, потом выборка всего.
+    # heapq не умеет decrease-key, поэтому для него - обычный прием с "ленивым" удалением
+    n, updates = 200000, 600000
+    rng = random.Random(1)
+    priorities = [rng.random() for _ in range(n)]
+    changes = [(rng.randrange(n), rng.random() * 0.5) for _ in range(updates)]
+
+    start = time.perf_counter()
+    pq = HeapPQ.from_iterable((i, p) for i, p in enumerate(priorities))
+    for handle, p in changes:
+        if p < pq.priority(handle):
+            pq.decrease_key(handle, p)
+    while pq:
+        pq.pop()
+    pq_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    best = priorities[:]
+    heap = [(p, i) for i, p in enumerate(priorities)]
+    heapq.heapify(heap)
+    for i, p in changes:
+        if p < best[i]:
+            best[i] = p
+            heapq.heappush(heap, (p, i))
+    while heap:
+        p, i = heapq.heappop(heap)
+        if p != best[i]:
+            continue
+    heapq_time = time.perf_counter() - start
+
+    print(f"HeapPQ:                    {pq_time:.3f} сек")
+    print(f"heapq + ленивое удаление:  {heapq_time:.3f} сек")
@@ -0,0 +1,119 @@
+import os
+import sys
+
+import matplotlib
+from tabulate import tabulate  #используется для красивого вывода таблички значений
+
+# отчеты по результатам run_tests: таблицы, графики, Excel. тяжелые библиотеки
+# (matplotlib, pandas, tabulate) грузятся только здесь, heapsort.py импортирует модуль лениво
+
+
+# есть ли куда показывать окно с графиком: на linux без X/Wayland и на неинтерактивном
+# бэкенде (Agg и т.п.) plt.show() бесполезен, а иногда и падает
+def has_display():
+    if sys.platform.startswith('linux') and not (os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY')):
+        return False
+    return matplotlib.get_backend().lower() not in ('agg', 'pdf', 'ps', 'svg', 'cairo', 'template')
+
+
+if not has_display():
+    matplotlib.use('Agg')
+
+import matplotlib.pyplot as plt
+import pandas as pd
+
+
+def print_partial_table(results):
+    print(tabulate(
+        [(r['Размер'], r['k'], f"{r['Полная (сек)']:.6f}", f"{r['Частичная (сек)']:.6f}",
+          f"{r['top-k (сек)']:.6f}", r['Итерации'], f"{r['Ускорение']:.2f}x") for r in results],
+        headers=['Размер', 'k', 'Полная (сек)', 'Частичная (сек)', 'top-k (сек)', 'Итерации', 'Ускорение'],
+        tablefmt='grid'
+    ))
+
+
+def print_results_table(results):
+    # дополнительные колонки (путь гибрида, доп. память и т.п.) показываем, если они есть хоть у кого-то
+    base = ['Алгоритм', 'Размер', 'Время (сек)', 'Итерации']
+    extra = []
+    for r in results:
+        extra += [c for c in r if c not in base and c not in extra and not c.startswith('_')]
+
+    print(tabulate(
+        [(r.get('Алгоритм', 'heapSort'), r['Размер'], f"{r['Время (сек)']:.6f}", r['Итерации'])
+         + tuple(r.get(c, '') for c in extra) for r in results],
+        headers=base + extra,
+        tablefmt='grid'
+    ))
+
+
+# группируем строки результатов по алгоритму, чтобы рисовать по линии на движок
+def _group_by_engine(results):
+    groups = {}
+    for r in results:
+        groups.setdefault(r.get('Алгоритм', 'heapSort'), []).append(r)
+    return groups
+
+
+def plot_performance(results):
+    groups = _group_by_engine(results)
+    # если хоть один движок собирал HeapStats, добавляем графики сравнений/обменов и фаз
+    detailed = {name: rows for name, rows in groups.items() if 'Сравнения' in rows[0]}
+    plot_rows = 2 if detailed else 1
+
+    plt.figure(figsize=(14, 6 * plot_rows))
+
+    plt.subplot(plot_rows, 2, 1)
+    for name, rows in groups.items():
+        plt.plot([r['Размер'] for r in rows], [r['Время (сек)'] for r in rows], '-o', label=name)
+    plt.xlabel('Размер массива')
+    plt.ylabel('Время выполнения (сек)')
+    plt.title('Зависимость времени выполнения от размера массива')
+    plt.legend()
+    plt.grid(True)
+
+    plt.subplot(plot_rows, 2, 2)
+    for name, rows in groups.items():
+        counted = [r for r in rows if r['Итерации'] is not None]
+        plt.plot([r['Размер'] for r in counted], [r['Итерации'] for r in counted], '-o', label=name)
+    plt.xlabel('Размер массива')
+    plt.ylabel('Количество итераций')
+    plt.title('Зависимость итераций от размера массива')
+    plt.legend()
+    plt.grid(True)
+
+    if detailed:
+        plt.subplot(plot_rows, 2, 3)
+        for name, rows in detailed.items():
+            sizes = [r['Размер'] for r in rows]
+            plt.plot(sizes, [r['Сравнения'] for r in rows], '-o', label=f'{name}: сравнения')
+            plt.plot(sizes, [r['Обмены'] for r in rows], '--s', label=f'{name}: обмены')
+        plt.xlabel('Размер массива')
+        plt.ylabel('Количество')
+        plt.title('Сравнения и обмены')
+        plt.legend()
+        plt.grid(True)
+
+        plt.subplot(plot_rows, 2, 4)
+        for name, rows in detailed.items():
+            sizes = [r['Размер'] for r in rows]
+            build = [r['Построение (сек)'] for r in rows]
+            extract = [r['Извлечение (сек)'] for r in rows]
+            plt.stackplot(sizes, build, extract, labels=[f'{name}: построение', f'{name}: извлечение'], alpha=0.6)
+        plt.xlabel('Размер массива')
+        plt.ylabel('Время (сек)')
+        plt.title('Время по фазам')
+        plt.legend(loc='upper left')
+        plt.grid(True)
+
+    plt.tight_layout()
+    plt.savefig('heapsort_performance.png')
+    if has_display():
+        plt.show()
+    plt.close()
+
+# необходимо также импортировать модуль openpyxl, чтобы посмотреть таблицу значений в ексель
+def save_to_excel(results, filename='heapsort_results.xlsx'):
+    df = pd.DataFrame([{c: v for c, v in r.items() if not c.startswith('_')} for r in results])
+    df.to_excel(filename, index=False)
+    print(f"Результаты сохранены в файл {filename}")
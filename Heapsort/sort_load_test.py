@@ -0,0 +1,83 @@
+import random
+import asyncio
+
+from sort_server import SortServer, SortClient, SMALL_REQUEST, _percentile
+
+# нагрузочный тест SortServer: много клиентов одновременно шлют по маленькому запросу на
+# сортировку, задержку каждого меряем на клиенте. тот же прогон повторяем с выключенными
+# пачками (каждый запрос - отдельная задача пула): пачки должны экономить на пересылке,
+# а не добавлять задержку, поэтому p50 и p99 с ними не должны быть заметно хуже
+
+# во сколько раз задержка с пачками может превышать задержку без них
+SLACK = 1.25
+
+
+async def _round(port, clients, size, seed):
+    rng = random.Random(seed)
+    payloads = [[rng.randrange(1 << 40) for _ in range(size)] for _ in range(clients)]
+    conns = await asyncio.gather(*(SortClient.connect(port=port) for _ in range(clients)))
+    loop = asyncio.get_running_loop()
+
+    async def one(client, values):
+        start = loop.time()
+        result, _ = await client.sort(values)
+        assert list(result) == sorted(values)
+        return loop.time() - start
+
+    try:
+        return await asyncio.gather(*(one(c, v) for c, v in zip(conns, payloads)))
+    finally:
+        for c in conns:
+            await c.close()
+
+
+# latencies - задержки всех раундов, кроме первого (в нем поднимаются процессы пула)
+async def measure(clients, size, rounds, workers, small_request):
+    latencies = []
+    async with SortServer(port=0, workers=workers, small_request=small_request) as server:
+        for r in range(rounds + 1):
+            result = await _round(server.port, clients, size, r)
+            if r:
+                latencies.extend(result)
+        metrics = await _metrics(server.port)
+    return sorted(latencies), metrics
+
+
+async def _metrics(port):
+    client = await SortClient.connect(port=port)
+    try:
+        return await client.metrics()
+    finally:
+        await client.close()
+
+
+async def run_load_test(clients=64, size=SMALL_REQUEST, rounds=3, workers=None):
+    results = {}
+    for name, small_request in (('с пачками', SMALL_REQUEST), ('без пачек', 0)):
+        latencies, metrics = await measure(clients, size, rounds, workers, small_request)
+        results[name] = latencies
+        print(f"{name:>10}: p50 {_percentile(latencies, 0.5) * 1000:.1f} мс, "
+              f"p99 {_percentile(latencies, 0.99) * 1000:.1f} мс, "
+              f"средняя пачка {metrics['avg_batch_size']:.1f} запросов")
+
+    batched, single = results['с пачками'], results['без пачек']
+    for q in (0.5, 0.99):
+        limit = _percentile(single, q) * SLACK
+        if _percentile(batched, q) > limit:
+            raise AssertionError(f"p{int(q * 100)} с пачками {_percentile(batched, q) * 1000:.1f} мс "
+                                 f"больше {limit * 1000:.1f} мс")
+    print("задержка с пачками не хуже, чем без них")
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Нагрузочный тест SortServer маленькими запросами")
+    parser.add_argument('--clients', type=int, default=64)
+    parser.add_argument('--size', type=int, default=SMALL_REQUEST)
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    asyncio.run(run_load_test(args.clients, args.size, args.rounds, args.workers))
@@ -0,0 +1,312 @@
+import os
+import sys
+import json
+import time
+import struct
+import asyncio
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from sort_engine import heapSortFloyd, heap_topk
+
+# бинарный протокол. запрос: заголовок REQUEST + count чисел по 8 байт (little-endian).
+# ответ: заголовок RESPONSE + count чисел того же типа; при ошибке count - длина текста ошибки,
+# для OP_METRICS - длина JSON
+REQUEST = struct.Struct('!BcIQ')    # операция, тип ('q' - int64, 'd' - float64), k, count
+RESPONSE = struct.Struct('!BcQQ')   # статус, тип ('j' - JSON), итерации, count
+
+OP_SORT = 1
+OP_TOPK = 2      # k наибольших, по убыванию
+OP_BOTTOMK = 3   # k наименьших, по возрастанию
+OP_METRICS = 4
+OP_NAMES = {OP_SORT: 'sort', OP_TOPK: 'topk', OP_BOTTOMK: 'bottomk', OP_METRICS: 'metrics'}
+
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+TYPECODES = (b'q', b'd')
+ITEM_SIZE = 8
+MAX_ELEMENTS = 1 << 27
+
+# запросы до SMALL_REQUEST элементов копим и отдаем в пул пачкой: либо через BATCH_WINDOW
+# секунд после первого, либо как только набралось BATCH_MAX запросов или BATCH_MAX_ELEMENTS
+# элементов. пачку делим на куски по числу воркеров, чтобы ее сортировал весь пул, а не
+# один процесс. большие запросы идут в пул по одному
+SMALL_REQUEST = 4096
+BATCH_WINDOW = 0.002
+BATCH_MAX = 256
+BATCH_MAX_ELEMENTS = 16384
+# сколько последних задержек храним на операцию для перцентилей
+LATENCY_WINDOW = 10000
+
+
+def _to_wire(arr):
+    if sys.byteorder == 'big':
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def _from_wire(typecode, data):
+    arr = array(typecode)
+    arr.frombytes(data)
+    if sys.byteorder == 'big':
+        arr.byteswap()
+    return arr
+
+
+# сама работа - выполняется в процессах пула, поэтому функции модульного уровня
+def execute(op, typecode, k, payload):
+    arr = _from_wire(typecode, payload)
+    if op == OP_SORT:
+        iterations = heapSortFloyd(arr, count=True)
+        return iterations, _to_wire(arr)
+    if op in (OP_TOPK, OP_BOTTOMK):
+        result = heap_topk(arr, k, largest=op == OP_TOPK)
+        return 0, _to_wire(array(typecode, result))
+    raise ValueError(f"Неизвестная операция: {op}")
+
+
+def execute_batch(requests):
+    results = []
+    for request in requests:
+        try:
+            results.append((True, execute(*request)))
+        except Exception as e:
+            results.append((False, str(e)))
+    return results
+
+
+def _percentile(ordered, q):
+    return ordered[int(q * (len(ordered) - 1))] if ordered else 0.0
+
+
+# делим пачку на parts кусков подряд, примерно поровну по числу элементов
+def _split_batch(batch, parts):
+    sizes = [len(args[3]) for args, _ in batch]
+    target = max(1, -(-sum(sizes) // parts))
+    slices, current, filled = [], [], 0
+    for entry, size in zip(batch, sizes):
+        current.append(entry)
+        filled += size
+        if filled >= target:
+            slices.append(current)
+            current, filled = [], 0
+    if current:
+        slices.append(current)
+    return slices
+
+
+class SortServer:
+    # small_request=0 выключает пачки: каждый запрос идет в пул сам по себе
+    def __init__(self, host='localhost', port=5556, workers=None, executor=None,
+                 small_request=SMALL_REQUEST, batch_max_elements=BATCH_MAX_ELEMENTS):
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.small_request = small_request
+        self.batch_max_elements = batch_max_elements
+        self.executor = executor
+        self._own_executor = executor is None
+        self.server = None
+
+        self.latencies = {op: deque(maxlen=LATENCY_WINDOW) for op in OP_NAMES}
+        self.requests_total = {op: 0 for op in OP_NAMES}
+        self.batches_total = 0
+        self.batched_requests = 0
+
+        self._pending = []  # (аргументы execute, future) ждущие отправки пачкой
+        self._pending_elements = 0
+        self._flush_handle = None
+        self._connections = set()  # задачи handle_client, чтобы закрыть их вместе с сервером
+
+    async def start(self):
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        self.server = await asyncio.start_server(self.handle_client, self.host, self.port)
+        # при port=0 ОС выбирает свободный порт - запоминаем, какой
+        self.port = self.server.sockets[0].getsockname()[1]
+        print(f"Сервер сортировки запущен на {self.host}:{self.port}")
+        return self
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            for task in list(self._connections):
+                task.cancel()
+            await asyncio.gather(*self._connections, return_exceptions=True)
+            await self.server.wait_closed()
+        if self._own_executor and self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def serve_forever(self):
+        await self.server.serve_forever()
+
+    async def handle_client(self, reader, writer):
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while True:
+                try:
+                    header = await reader.readexactly(REQUEST.size)
+                except asyncio.IncompleteReadError:
+                    break
+                op, typecode, k, count = REQUEST.unpack(header)
+                start = time.perf_counter()
+
+                if op == OP_METRICS:
+                    self._send(writer, STATUS_OK, b'j', 0, json.dumps(self.metrics()).encode('utf-8'))
+                elif op not in OP_NAMES or typecode not in TYPECODES or count > MAX_ELEMENTS:
+                    # длину тела мы не можем доверять - отвечаем ошибкой и закрываем соединение
+                    self._send(writer, STATUS_ERROR, typecode, 0,
+                               f"Некорректный запрос: op={op}, type={typecode!r}, count={count}".encode('utf-8'))
+                    await writer.drain()
+                    break
+                else:
+                    payload = await reader.readexactly(count * ITEM_SIZE)
+                    try:
+                        iterations, result = await self.dispatch(op, typecode.decode(), k, payload)
+                        self._send(writer, STATUS_OK, typecode, iterations, result, len(result) // ITEM_SIZE)
+                    except Exception as e:
+                        self._send(writer, STATUS_ERROR, typecode, 0, str(e).encode('utf-8'))
+
+                await writer.drain()
+                self.requests_total[op] += 1
+                self.latencies[op].append(time.perf_counter() - start)
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            self._connections.discard(task)
+            writer.close()
+
+    def _send(self, writer, status, typecode, iterations, payload, count=None):
+        writer.write(RESPONSE.pack(status, typecode, iterations, len(payload) if count is None else count))
+        writer.write(payload)
+
+    # маленькие запросы копятся в пачку, большие сразу уходят в пул процессов.
+    # в обоих случаях цикл событий только ждет результат и сам ничего не сортирует
+    async def dispatch(self, op, typecode, k, payload):
+        loop = asyncio.get_running_loop()
+        if len(payload) // ITEM_SIZE > self.small_request:
+            return await loop.run_in_executor(self.executor, execute, op, typecode, k, payload)
+
+        future = loop.create_future()
+        self._pending.append(((op, typecode, k, payload), future))
+        self._pending_elements += len(payload) // ITEM_SIZE
+        if len(self._pending) >= BATCH_MAX or self._pending_elements >= self.batch_max_elements:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(BATCH_WINDOW, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        self._pending_elements = 0
+        if batch:
+            workers = self.workers or os.cpu_count() or 1
+            for part in _split_batch(batch, min(workers, len(batch))):
+                asyncio.ensure_future(self._run_batch(part))
+
+    async def _run_batch(self, batch):
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(self.executor, execute_batch, [args for args, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.batches_total += 1
+        self.batched_requests += len(batch)
+        for (_, future), (ok, value) in zip(batch, results):
+            if future.done():
+                continue
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(ValueError(value))
+
+    # задержки в миллисекундах по каждой операции + статистика пачек
+    def metrics(self):
+        result = {}
+        for op, name in OP_NAMES.items():
+            ordered = sorted(self.latencies[op])
+            result[name] = {
+                'count': self.requests_total[op],
+                'p50_ms': _percentile(ordered, 0.5) * 1000,
+                'p99_ms': _percentile(ordered, 0.99) * 1000,
+                'max_ms': (ordered[-1] if ordered else 0.0) * 1000,
+            }
+        result['batches'] = self.batches_total
+        result['avg_batch_size'] = self.batched_requests / self.batches_total if self.batches_total else 0.0
+        return result
+
+
+# клиент на том же asyncio; годится и для тестов с сервером в том же процессе
+class SortClient:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def connect(cls, host='localhost', port=5556):
+        reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def _call(self, op, values=(), typecode='q', k=0):
+        arr = values if isinstance(values, array) and values.typecode == typecode else array(typecode, values)
+        self.writer.write(REQUEST.pack(op, typecode.encode(), k, len(arr)) + _to_wire(arr))
+        await self.writer.drain()
+
+        status, rtype, iterations, count = RESPONSE.unpack(await self.reader.readexactly(RESPONSE.size))
+        if status != STATUS_OK:
+            raise RuntimeError((await self.reader.readexactly(count)).decode('utf-8'))
+        if rtype == b'j':
+            return json.loads(await self.reader.readexactly(count)), iterations
+        return _from_wire(rtype.decode(), await self.reader.readexactly(count * ITEM_SIZE)), iterations
+
+    # возвращает (отсортированный array, итерации)
+    async def sort(self, values, typecode='q'):
+        return await self._call(OP_SORT, values, typecode)
+
+    async def topk(self, values, k, largest=True, typecode='q'):
+        result, _ = await self._call(OP_TOPK if largest else OP_BOTTOMK, values, typecode, k)
+        return result
+
+    async def metrics(self):
+        result, _ = await self._call(OP_METRICS)
+        return result
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Сервер сортировки кучей")
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=5556)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    async def main():
+        async with SortServer(args.host, args.port, args.workers) as server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("Останавливаем сервер...")
@@ -8,15 +8,68 @@ from PyQt6.QtCore import Q_ARG, Qt, QMetaObject, QTimer, QObject, pyqtSignal, py
 from PyQt6.QtWidgets import QWidget, QVBoxLayout, QLineEdit, QApplication, QPushButton, QHBoxLayout, QListWidget, \
     QRadioButton, QListWidgetItem, QCheckBox, QLabel, QMessageBox, QMainWindow, QInputDialog
 
+# самое длинное сообщение от сервера: снимок доски может быть намного больше команды клиента
+MAX_MESSAGE = 1 << 30
+# начальный размер буфера приема; растет до MAX_MESSAGE, если сообщение не влезает
+RECV_BUFFER = 64 * 1024
+
+
+# разбивка потока байт на сообщения по \n. данные читаются recv_into в один и тот же
+# bytearray без промежуточных копий; за одно чтение может прийти сколько угодно сообщений,
+# а длинное сообщение (снимок доски) собирается из нескольких чтений
+class LineReader:
+    def __init__(self, sock, max_frame=MAX_MESSAGE, size=RECV_BUFFER):
+        self.sock = sock
+        self.max_frame = max_frame
+        self.buffer = bytearray(min(size, max_frame + 1))
+        self.start = 0  # начало еще не выданных данных
+        self.scan = 0   # до сюда \n уже искали
+        self.end = 0    # конец принятых данных
+
+    def _make_room(self):
+        # сдвигаем недочитанный хвост в начало буфера
+        if self.start:
+            tail = self.end - self.start
+            self.buffer[:tail] = self.buffer[self.start:self.end]
+            self.scan -= self.start
+            self.end = tail
+            self.start = 0
+        if self.end == len(self.buffer):
+            if self.end > self.max_frame:
+                raise ValueError(f"Сообщение длиннее {self.max_frame} байт")
+            self.buffer.extend(bytes(min(len(self.buffer), self.max_frame + 1 - len(self.buffer))))
+
+    # выдает сообщения (строки без \n), пока сервер не закроет соединение.
+    # декодируем прямо из буфера через memoryview, без промежуточной копии в bytes
+    def frames(self):
+        while True:
+            with memoryview(self.buffer) as view:
+                while True:
+                    nl = self.buffer.find(b'\n', self.scan, self.end)
+                    if nl < 0:
+                        self.scan = self.end
+                        break
+                    yield str(view[self.start:nl], 'utf-8')
+                    self.start = self.scan = nl + 1
+
+            self._make_room()
+            with memoryview(self.buffer) as view:
+                received = self.sock.recv_into(view[self.end:])
+            if not received:
+                return
+            self.end += received
+
 
 class TaskWidget(QWidget):
-    def __init__(self, text, priority, completed=False):
+    def __init__(self, task_id, text, priority, completed=False):
         super().__init__()
+        self.task_id = task_id  # постоянный id задачи на сервере
         self.text = text
         self.priority = priority
         self.completed = completed
-        #добавили ссылку на клиента
+        #добавили ссылку на клиента и доску, на которой лежит задача
         self.client = None
+        self.board_name = None
 
         layout = QHBoxLayout(self)
 
@@ -36,8 +89,9 @@ class TaskWidget(QWidget):
         layout.addWidget(self.down_button)
         layout.addStretch()
 
-    def set_client(self, client): #ссылка на клиента
+    def set_client(self, client, board_name): #ссылка на клиента
         self.client = client
+        self.board_name = board_name
 
     # стиль для определенного приоритета (остается без изменений)
     def apply_priority_style(self):
@@ -53,7 +107,7 @@ class TaskWidget(QWidget):
         else:
             self.label.setStyleSheet("color: gray; text-decoration: line-through;")
 
-    # функция для смены стиля, если чекбокс прожали + отправляем клиенту изменения
+    # функция для смены стиля, если чекбокс прожали + отправляем на сервер только это поле
     @pyqtSlot(int)
     def update_style(self, state):
         self.completed = state == 2
@@ -63,7 +117,7 @@ class TaskWidget(QWidget):
             self.label.setStyleSheet(self._default_style)
 
         if self.client:
-            self.client.send_task_update()
+            self.client.set_field(self.board_name, self.task_id, "completed", self.completed)
 
     @pyqtSlot()
     def increase_priority(self):
@@ -73,7 +127,7 @@ class TaskWidget(QWidget):
             self.priority = order[idx + 1]
             self.apply_priority_style()
             if self.client:
-                self.client.send_task_update()
+                self.client.set_field(self.board_name, self.task_id, "priority", self.priority)
 
     @pyqtSlot()
     def decrease_priority(self):
@@ -83,26 +137,41 @@ class TaskWidget(QWidget):
             self.priority = order[idx - 1]
             self.apply_priority_style()
             if self.client:
-                self.client.send_task_update()
+                self.client.set_field(self.board_name, self.task_id, "priority", self.priority)
+
+    # изменение, пришедшее с сервера: обновляем вид, но обратно ничего не отправляем
+    def apply_field(self, field, value):
+        if field == "text":
+            self.text = value
+            self.label.setText(value)
+        elif field == "priority":
+            self.priority = value
+            self.apply_priority_style()
+        elif field == "completed":
+            self.completed = value
+            self.checkbox.blockSignals(True)
+            self.checkbox.setChecked(value)
+            self.checkbox.blockSignals(False)
+            self.apply_priority_style()
 
 
 class TaskSignals(QObject):
-    tasks_updated = pyqtSignal(list, str)
+    tasks_updated = pyqtSignal(dict, str)  # снимок доски {"version", "tasks"}
+    delta_received = pyqtSignal(dict, str)
     boards_updated = pyqtSignal(list)
 
 
+# одно соединение на все окно: подписки на доски копятся на сервере,
+# а сообщения по сигналам расходятся окнам досок по имени доски
 class TaskClient:
-    def __init__(self, host='localhost', port=5555, board="Главная доска"):
+    def __init__(self, host='localhost', port=5555):
         self.host = host
         self.port = port
-        self.current_board = board
         self.socket = None
         # ссылка на поток для приема сообщений с сервера
         self.receive_thread = None
         # флаг для контроля работы потока
         self.running = False
-        # ссылка на главное окно (то есть мы делаем взаимную связь между ними
-        self.task_manager = None
         self.signals = TaskSignals()
 
     # функция для подключения к серверу
@@ -122,27 +191,19 @@ class TaskClient:
 
     # функция получения сообщений с сервера
     def receive_messages(self):
-        # буфер для накопления неполных сообщений
-        buffer = ""
-        while self.running:
-            try:
-                data = self.socket.recv(1024).decode('utf-8')
-                # если данных нет - сервер отключился, выходим из цикла
-                if not data:
-                    print("Сервер отключен.")
-                    break
-                # добавляем полученные данные в буфер
-                buffer += data
-                # обрабатываем все полные сообщения (разделенные \n)
-                while '\n' in buffer:
-                    # разделяем буфер на первую строку и оставшуюся часть
-                    line, buffer = buffer.split('\n', 1)
-                    # обрабатываем полученное сообщение (убираем пробелы)
-                    self.process_message(line.strip())
-            except Exception as e:
-                if self.running:
-                    print(f"Ошибка получения данных: {e}")
-                break
+        # режем поток на сообщения LineReader: один bytearray,
+        # поиск \n продолжается с места, где остановился, так что длинный снимок доски,
+        # пришедший многими кусками, не копируется и не перебирается заново на каждом recv
+        try:
+            for line in LineReader(self.socket).frames():
+                # обрабатываем полученное сообщение (убираем пробелы)
+                self.process_message(line.strip())
+            # frames закончился - сервер отключился
+            if self.running:
+                print("Сервер отключен.")
+        except Exception as e:
+            if self.running:
+                print(f"Ошибка получения данных: {e}")
         self.running = False
 
     # функция обработки сообщений, которые пришли к нам с сервера
@@ -152,11 +213,18 @@ class TaskClient:
                 parts = message.split(':', 2)
                 board_name = parts[1]
                 tasks_data = parts[2]
-                tasks = json.loads(tasks_data)
-                self.signals.tasks_updated.emit(tasks, board_name)
+                snapshot = json.loads(tasks_data)
+                self.signals.tasks_updated.emit(snapshot, board_name)
             except (json.JSONDecodeError, IndexError) as e:
                 print(f"Ошибка обработки задач: {e} | Message: {message}")
 
+        elif message.startswith('DELTA:'):
+            try:
+                parts = message.split(':', 2)
+                self.signals.delta_received.emit(json.loads(parts[2]), parts[1])
+            except (json.JSONDecodeError, IndexError) as e:
+                print(f"Ошибка обработки изменения: {e} | Message: {message}")
+
         elif message.startswith('BOARDS:'):
             try:
                 boards_data = message[7:]
@@ -165,6 +233,9 @@ class TaskClient:
             except json.JSONDecodeError as e:
                 print(f"Ошибка обработки списка досок: {e}")
 
+        elif message.startswith('ERROR:'):
+            print(f"Сервер: {message[6:]}")
+
     # отправляем сообщение на сервер
     def send(self, message):
         if not self.running:
@@ -177,19 +248,32 @@ class TaskClient:
             print(f"Ошибка отправки: {e}")
             self.disconnect()
 
-    # отправляем новую таску на сервер
-    def add_task(self, task):
-        self.send(f"ADD:{self.current_board}:{json.dumps(task)}")
+    # изменения уходят на сервер дельтами, id новой задаче выдает сервер
+    def send_delta(self, board_name, delta):
+        self.send(f"DELTA:{board_name}:{json.dumps(delta)}")
+
+    # отправляем новую таску на сервер (в конец доски или на позицию index)
+    def add_task(self, board_name, task, index=None):
+        self.send_delta(board_name, {"op": "insert", "task": task, "index": index})
+
+    def set_field(self, board_name, task_id, field, value):
+        self.send_delta(board_name, {"op": "set_field", "id": task_id, "field": field, "value": value})
+
+    def delete_task(self, board_name, task_id):
+        self.send_delta(board_name, {"op": "delete", "id": task_id})
+
+    def move_task(self, board_name, task_id, index):
+        self.send_delta(board_name, {"op": "move", "id": task_id, "index": index})
+
+    # снимок доски + подписка на ее изменения (остальные подписки остаются)
+    def get_tasks(self, board_name):
+        self.send(f"GET_TASKS:{board_name}")
 
-    # отправляем обновленный список тасок на сервер
-    def update_tasks(self, tasks):
-        self.send(f"UPDATE:{self.current_board}:{json.dumps(tasks)}")
+    def unsubscribe(self, board_name):
+        self.send(f"UNSUBSCRIBE:{board_name}")
 
-    # Запрос задач для текущей или новой доски
-    def get_tasks(self, board_name=None):
-        if board_name:
-            self.current_board = board_name
-        self.send(f"GET_TASKS:{self.current_board}")
+    def create_board(self, board_name):
+        self.send(f"CREATE:{board_name}")
 
     def get_boards(self):
         self.send("GET_BOARDS:ALL")
@@ -205,23 +289,19 @@ class TaskClient:
                 except:
                     pass
 
-    @pyqtSlot()
-    def send_task_update(self):
-        if self.task_manager:
-            self.task_manager.send_task_update()
-
 
 class TaskManager(QWidget):
-    def __init__(self, board_name="Главная доска"):
+    def __init__(self, client, board_name="Главная доска"):
         super().__init__()
         self.board_name = board_name
-        # обмениваемся ссылками друг на друга
-        self.client = TaskClient(board=self.board_name)
+        # соединение общее с главным окном, сами только подписываемся на свою доску
+        self.client = client
         self.client.signals.tasks_updated.connect(self.update_tasks)
-        self.client.task_manager = self
+        self.client.signals.delta_received.connect(self.apply_delta)
 
         self.tasks = []  # локальная копия задач
-        self.task_widgets = []  # ссылки на виджеты задач
+        self.task_widgets = {}  # id задачи -> виджет
+        self.version = None  # версия доски, до которой дошла локальная копия
 
         self.setWindowTitle(f"Task Manager - {self.board_name}")
 
@@ -273,13 +353,12 @@ class TaskManager(QWidget):
         self.time_timer.timeout.connect(self.update_clock)
         self.time_timer.start(1000)
 
-        # пытаемся подрубиться к серверу
-        if self.client.connect():
-            # запрашиваем текущие задачи
-            self.client.get_tasks()
+        # подписываемся на доску и запрашиваем текущие задачи
+        if self.client.running:
+            self.client.get_tasks(self.board_name)
             self.update_clock()
         else:
-            QMessageBox.critical(self, "Ошибка", "Не удалось подключиться к серверу")
+            QMessageBox.critical(self, "Ошибка", "Нет подключения к серверу")
             self.status_label.setText("Статус: Отключено")
 
     @pyqtSlot()
@@ -306,7 +385,7 @@ class TaskManager(QWidget):
                 "completed": False
             }
             # отправляем на сервер
-            self.client.add_task(task_dict)
+            self.client.add_task(self.board_name, task_dict)
             self.task_input.clear()
 
     @pyqtSlot()
@@ -320,19 +399,8 @@ class TaskManager(QWidget):
                 QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
             )
             if reply == QMessageBox.StandardButton.Yes:
-                row = self.tasks_list.row(selected_item)
-                current_tasks = []
-                for i in range(self.tasks_list.count()):
-                    item = self.tasks_list.item(i)
-                    widget = self.tasks_list.itemWidget(item)
-                    current_tasks.append({
-                        "text": widget.text,
-                        "priority": widget.priority,
-                        "completed": widget.completed
-                    })
-                if 0 <= row < len(current_tasks):
-                    current_tasks.pop(row)
-                    self.client.update_tasks(current_tasks)
+                widget = self.tasks_list.itemWidget(selected_item)
+                self.client.delete_task(self.board_name, widget.task_id)
 
     @pyqtSlot()
     def delete_completed_tasks(self):
@@ -344,71 +412,99 @@ class TaskManager(QWidget):
             QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
         )
         if reply == QMessageBox.StandardButton.Yes:
-            new_tasks = []
-            for i in range(self.tasks_list.count()):
-                item = self.tasks_list.item(i)
-                widget = self.tasks_list.itemWidget(item)
-                if not widget.completed:
-                    new_tasks.append({
-                        "text": widget.text,
-                        "priority": widget.priority,
-                        "completed": widget.completed
-                    })
+            completed_ids = [task["id"] for task in self.tasks if task["completed"]]
             # проверяем, есть ли что удалять
-            if len(new_tasks) < self.tasks_list.count():
-                # отправляем обновленный список на сервер
-                self.client.update_tasks(new_tasks)
+            if completed_ids:
+                # удаляем по одной дельте на задачу
+                for task_id in completed_ids:
+                    self.client.delete_task(self.board_name, task_id)
                 # просто уведомление
-                deleted_count = self.tasks_list.count() - len(new_tasks)
+                deleted_count = len(completed_ids)
                 msg = f"Удалено {deleted_count} выполненных задач"
                 QMessageBox.information(self, "Информация", msg)
             else:
                 QMessageBox.information(self, "Информация", "Нет выполненных задач для удаления")
 
-    # функция отправки задачек на сервер
-    def send_task_update(self):
-        # собираем актуальное состояние из виджетов в словари
-        current_tasks = []
-        for i in range(self.tasks_list.count()):
-            item = self.tasks_list.item(i)
-            widget = self.tasks_list.itemWidget(item)
-            # создаем словарь с данными задачи
-            task_data = {
-                "text": widget.text,
-                "priority": widget.priority,
-                "completed": widget.completed
-            }
-            current_tasks.append(task_data)
-
-        # отправляем на сервер
-        self.client.update_tasks(current_tasks)
-
-    # обновляем интерфейс на основе полученных задач (вызывается из сетевого потока)
-    @pyqtSlot(list, str)
-    def update_tasks(self, tasks, board_name):
+    # строка списка с виджетом задачи на позиции row
+    def _insert_row(self, row, task):
+        widget = TaskWidget(task["id"], task["text"], task["priority"], task["completed"])
+        widget.set_client(self.client, self.board_name)
+
+        item = QListWidgetItem()
+        item.setSizeHint(widget.sizeHint())
+        self.tasks_list.insertItem(row, item)
+        self.tasks_list.setItemWidget(item, widget)
+        self.task_widgets[task["id"]] = widget
+
+    def _row_of(self, task_id):
+        for row, task in enumerate(self.tasks):
+            if task["id"] == task_id:
+                return row
+        return -1
+
+    # полный снимок доски: приходит при подписке и после пропуска версий
+    @pyqtSlot(dict, str)
+    def update_tasks(self, snapshot, board_name):
         if board_name != self.board_name:
             return
 
-        self.tasks = tasks
+        self.version = snapshot["version"]
+        self.tasks = snapshot["tasks"]
         self.tasks_list.clear()
         self.task_widgets.clear()
 
-        for task in tasks:
-            widget = TaskWidget(task["text"], task["priority"], task["completed"])
-            widget.set_client(self.client)
-
-            item = QListWidgetItem()
-            item.setSizeHint(widget.sizeHint())
-            self.tasks_list.addItem(item)
-            self.tasks_list.setItemWidget(item, widget)
-            self.task_widgets.append(widget)
+        for row, task in enumerate(self.tasks):
+            self._insert_row(row, task)
 
         self.update_clock()
         self.setWindowTitle(f"Task Manager - {self.board_name}")
 
+    # одна дельта с сервера. версия должна быть ровно следующей: старые повторы пропускаем,
+    # а если что-то потерялось - просим у сервера снимок заново
+    @pyqtSlot(dict, str)
+    def apply_delta(self, delta, board_name):
+        if board_name != self.board_name or self.version is None:
+            return
+        if delta["version"] <= self.version:
+            return
+        if delta["version"] != self.version + 1:
+            self.version = None
+            self.client.get_tasks(self.board_name)
+            return
+        self.version = delta["version"]
+
+        op = delta["op"]
+        if op == "insert":
+            self.tasks.insert(delta["index"], delta["task"])
+            self._insert_row(delta["index"], delta["task"])
+        elif op == "set_field":
+            row = self._row_of(delta["id"])
+            if row >= 0:
+                self.tasks[row][delta["field"]] = delta["value"]
+                self.task_widgets[delta["id"]].apply_field(delta["field"], delta["value"])
+        elif op == "delete":
+            row = self._row_of(delta["id"])
+            if row >= 0:
+                self.tasks.pop(row)
+                self.tasks_list.takeItem(row)
+                self.task_widgets.pop(delta["id"], None)
+        elif op == "move":
+            row = self._row_of(delta["id"])
+            if row >= 0:
+                task = self.tasks.pop(row)
+                self.tasks_list.takeItem(row)
+                self.tasks.insert(delta["index"], task)
+                # виджет после takeItem не переносится, создаем заново
+                self._insert_row(delta["index"], task)
+
+        self.update_clock()
+
     # закрываем окошко
     def closeEvent(self, event):
-        self.client.disconnect()
+        # соединение общее - только отписываемся от доски и от сигналов
+        self.client.unsubscribe(self.board_name)
+        self.client.signals.tasks_updated.disconnect(self.update_tasks)
+        self.client.signals.delta_received.disconnect(self.apply_delta)
         self.time_timer.stop() #стопаем таймер
         event.accept()
 
@@ -465,7 +561,7 @@ class MainWindow(QMainWindow):
 
         if ok and board_name.strip():
             board_name = board_name.strip()
-            self.board_client.get_tasks(board_name=board_name)
+            self.board_client.create_board(board_name)
             self.get_boards()
 
 
@@ -480,7 +576,7 @@ class MainWindow(QMainWindow):
                 self.task_clients[board_name].activateWindow()
                 return
 
-            task_manager = TaskManager(board_name)
+            task_manager = TaskManager(self.board_client, board_name)
             task_manager.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose, True)
             task_manager.destroyed.connect(lambda: self.task_clients.pop(board_name, None))
 
@@ -488,11 +584,11 @@ class MainWindow(QMainWindow):
             task_manager.show()
 
     def closeEvent(self, event):
-        self.board_client.disconnect()
-
         for manager in list(self.task_clients.values()):
             manager.close()
 
+        self.board_client.disconnect()
+
         event.accept()
 
 
@@ -0,0 +1,165 @@
+import json
+import time
+import socket
+import asyncio
+import multiprocessing
+
+from Task_Server_Async import AsyncTaskServer
+
+# нагрузочный тест AsyncTaskServer: тысячи пассивных зрителей на разных досках, несколько
+# "зондов" на тестовой доске и писатель, который шлет туда дельты с отметкой времени.
+# задержка рассылки - от отправки дельты писателем до ее получения зондом.
+# второй прогон - то же самое, но на тестовой доске висит клиент, который ничего не читает
+
+
+def _serve(port_queue):
+    async def main():
+        server = await AsyncTaskServer('localhost', 0).start()
+        port_queue.put(server.port)
+        await server.serve_forever()
+
+    asyncio.run(main())
+
+
+# лимит открытых файлов поднимаем до жесткого: каждый зритель - сокет
+def raise_nofile():
+    try:
+        import resource
+    except ImportError:
+        return None
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    return hard
+
+
+async def _read_forever(reader, on_line=None):
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            if on_line is not None:
+                on_line(line)
+    except (ConnectionError, asyncio.CancelledError):
+        pass
+
+
+async def _open(port, board, on_line=None):
+    reader, writer = await asyncio.open_connection('localhost', port, limit=1 << 24)
+    writer.write(f"GET_TASKS:{board}\n".encode('utf-8'))
+    await writer.drain()
+    await reader.readline()  # снимок доски
+    return writer, asyncio.ensure_future(_read_forever(reader, on_line))
+
+
+def _percentile(ordered, q):
+    return ordered[int(q * (len(ordered) - 1))] if ordered else 0.0
+
+
+# клиент, который подписался и перестал читать: маленький буфер приема, чтобы он забился быстро
+def _stalled_client(port, board):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    sock.connect(('localhost', port))
+    sock.sendall(f"GET_TASKS:{board}\n".encode('utf-8'))
+    return sock
+
+
+# отключил ли сервер клиента: дочитываем все, что успело прийти, до конца потока
+def _was_evicted(sock, timeout=2.0):
+    sock.settimeout(timeout)
+    try:
+        while sock.recv(1 << 20):
+            pass
+        return True
+    except ConnectionResetError:
+        return True
+    except socket.timeout:
+        return False
+    finally:
+        sock.close()
+
+
+async def _probe_round(port, board, probes, deltas, interval, payload):
+    latencies = []
+
+    def on_line(line):
+        # DELTA:доска:{"op": "set_field", ..., "value": "отметка|заполнитель"}
+        delta = json.loads(line.decode('utf-8').split(':', 2)[2])
+        if delta["op"] == "set_field":
+            latencies.append(time.perf_counter() - float(delta["value"].split('|', 1)[0]))
+
+    probe_conns = [await _open(port, board, on_line) for _ in range(probes)]
+
+    reader, writer = await asyncio.open_connection('localhost', port)
+    task = {"text": "нагрузка", "priority": "low", "completed": False}
+    writer.write(f"DELTA:{board}:{json.dumps({'op': 'insert', 'task': task})}\n".encode('utf-8'))
+    line = await reader.readline()
+    task_id = json.loads(line.decode('utf-8').split(':', 2)[2])["task"]["id"]
+    drain = asyncio.ensure_future(_read_forever(reader))
+
+    pad = 'x' * payload
+    for _ in range(deltas):
+        delta = {"op": "set_field", "id": task_id, "field": "text", "value": f"{time.perf_counter()!r}|{pad}"}
+        writer.write(f"DELTA:{board}:{json.dumps(delta)}\n".encode('utf-8'))
+        await writer.drain()
+        await asyncio.sleep(interval)
+    await asyncio.sleep(0.5)
+
+    for w, t in probe_conns + [(writer, drain)]:
+        t.cancel()
+        w.close()
+    return sorted(latencies)
+
+
+async def run_load_test(port, viewers=10000, boards=100, probes=10, deltas=5000, interval=0.001, payload=2048):
+    print(f"Подключаем {viewers} зрителей на {boards} досок...")
+    start = time.perf_counter()
+    idle = []
+    batch = 200
+    for i in range(0, viewers, batch):
+        idle += await asyncio.gather(*(_open(port, f"idle-{j % boards}") for j in range(i, min(i + batch, viewers))))
+    print(f"   готово за {time.perf_counter() - start:.1f} сек")
+
+    results = {}
+    for name, stalled in (("без зависшего клиента", False), ("с зависшим клиентом", True)):
+        sock = _stalled_client(port, "load") if stalled else None
+        latencies = await _probe_round(port, "load", probes, deltas, interval, payload)
+        evicted = _was_evicted(sock) if stalled else None
+        results[name] = latencies
+        print(f"{name:>24}: получено {len(latencies)}, p50 {_percentile(latencies, 0.5) * 1000:.2f} мс, "
+              f"p99 {_percentile(latencies, 0.99) * 1000:.2f} мс, max {(latencies[-1] if latencies else 0) * 1000:.2f} мс"
+              + ("" if evicted is None else f", зависший клиент отключен: {'да' if evicted else 'нет'}"))
+
+    for writer, task in idle:
+        task.cancel()
+        writer.close()
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Нагрузочный тест AsyncTaskServer")
+    parser.add_argument('--viewers', type=int, default=10000)
+    parser.add_argument('--boards', type=int, default=100)
+    parser.add_argument('--probes', type=int, default=10)
+    parser.add_argument('--deltas', type=int, default=5000)
+    parser.add_argument('--interval', type=float, default=0.001, help="пауза между дельтами, сек")
+    parser.add_argument('--payload', type=int, default=2048, help="размер текста в дельте, байт")
+    args = parser.parse_args()
+
+    limit = raise_nofile()
+    if limit is not None and limit < args.viewers + 100:
+        print(f"Лимит открытых файлов {limit} меньше числа зрителей, тест может упасть")
+
+    # сервер - в отдельном процессе, чтобы клиенты не делили с ним цикл событий
+    port_queue = multiprocessing.Queue()
+    server = multiprocessing.Process(target=_serve, args=(port_queue,), daemon=True)
+    server.start()
+    try:
+        asyncio.run(run_load_test(port_queue.get(), args.viewers, args.boards, args.probes,
+                                  args.deltas, args.interval, args.payload))
+    finally:
+        server.terminate()
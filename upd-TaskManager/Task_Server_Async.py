@@ -0,0 +1,334 @@
+import asyncio
+import json
+from collections import deque
+from functools import partial
+
+from Task_Server_UPD import Board
+
+# сервер задач на asyncio: один поток, без блокировок. команда обрабатывается целиком
+# между await, поэтому изменение доски, запись в журнал и постановка дельты в рассылку
+# атомарны сами по себе, а в сеть никто не пишет напрямую - только через очередь подключения.
+# с хранилищем изменение уходит клиентам (и автору тоже) только после fsync его записи
+# журнала: что клиент увидел, то переживет сбой. снимки доски тоже ждут своей очереди,
+# чтобы не обогнать еще не разосланные дельты.
+# протокол - строки "КОМАНДА:доска:json". снимок доски уходит только при подписке
+# (GET_TASKS) и после UPDATE: TASKS:доска:{"version": v, "tasks": [...]}.
+# все остальное - дельты DELTA:доска:{"op": ..., "version": v, ...}
+# одно соединение может быть подписано на несколько досок; UNSUBSCRIBE:доска отписывает
+
+# сколько сообщений может ждать отправки одному клиенту. кто не успевает их забирать -
+# медленный потребитель, его отключаем, чтобы он не держал память и не тормозил остальных
+WRITE_QUEUE_SIZE = 1024
+# сколько ждем, пока клиент примет уже записанное (drain), прежде чем отключить его
+DRAIN_TIMEOUT = 10.0
+# максимальная длина одной команды вместе с JSON - защита от клиента, который шлет без \n.
+# команды режет на строки буфер StreamReader, своего буфера приема у сервера нет
+MAX_LINE = 16 * 1024 * 1024
+# очередь входящих подключений: при тысячах зрителей 100 по умолчанию мало
+BACKLOG = 4096
+# команды с именем доски (GET_BOARDS - без него) и те из них, которые создают доску, если ее нет
+BOARD_COMMANDS = {"GET_TASKS", "CREATE", "ADD", "UPDATE", "DELTA", "UNSUBSCRIBE"}
+CREATING_COMMANDS = {"GET_TASKS", "CREATE", "ADD", "UPDATE"}
+
+
+class Connection:
+    __slots__ = ('writer', 'queue', 'boards', 'closed', 'task', 'sender', 'peer')
+
+    def __init__(self, writer, queue_size):
+        self.writer = writer
+        self.queue = asyncio.Queue(queue_size)
+        self.boards = set()  # доски, на которые подписано подключение
+        self.closed = False
+        self.task = None    # задача чтения команд
+        self.sender = None  # задача записи из очереди в сокет
+        self.peer = writer.get_extra_info('peername')
+
+    # False - очередь полна, клиент не успевает читать
+    def send(self, data):
+        if self.closed:
+            return True
+        try:
+            self.queue.put_nowait(data)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+
+class AsyncTaskServer:
+    def __init__(self, host='localhost', port=5555, queue_size=WRITE_QUEUE_SIZE, drain_timeout=DRAIN_TIMEOUT,
+                 storage=None, max_line=MAX_LINE):
+        self.host = host
+        self.port = port
+        self.queue_size = queue_size
+        self.drain_timeout = drain_timeout
+        self.max_line = max_line
+        self.server = None
+        self.loop = None
+
+        self.tasks = {}  # имя доски -> Board
+        self.subscribers = {}  # имя доски -> множество подключений
+        self.connections = set()
+        self.next_id = 1  # id задач общие для всех досок и не переиспользуются
+        self.evicted = 0
+        # storage (TaskStorage) - журнал и снимки на диске; без него все живет только в памяти
+        self.storage = storage
+        self.last_seq = 0  # номер последней записи журнала
+        self.durable_seq = 0  # до этого номера цикл событий уже знает, что все на диске
+        # (seq, функция) по возрастанию seq: что сделать, когда запись seq будет на диске
+        self.durable_waiters = deque()
+        if storage is not None:
+            self.tasks, self.next_id = storage.load()
+            self.last_seq = self.durable_seq = storage.seq
+        if "Главная доска" not in self.tasks:
+            self.tasks["Главная доска"] = Board("Главная доска")
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        if self.storage is not None:
+            # fsync идет в потоке хранилища, а ожидающих будим уже в цикле событий
+            self.storage.on_durable = lambda seq: self.loop.call_soon_threadsafe(self._durable_reached, seq)
+        self.server = await asyncio.start_server(self.handle_client, self.host, self.port,
+                                                 limit=self.max_line, backlog=BACKLOG)
+        # при port=0 ОС выбирает свободный порт - запоминаем, какой
+        self.port = self.server.sockets[0].getsockname()[1]
+        print(f"Сервер задач (asyncio) запущен на {self.host}:{self.port}")
+        return self
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            tasks = [conn.task for conn in self.connections if conn.task is not None]
+            for conn in list(self.connections):
+                self._drop(conn)
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self.server.wait_closed()
+        if self.storage is not None:
+            # close дописывает журнал и ждет фоновый снимок - не в цикле событий
+            await self.loop.run_in_executor(None, self.storage.close)
+            self._durable_reached(self.last_seq)
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def serve_forever(self):
+        await self.server.serve_forever()
+
+    def _new_id(self):
+        task_id = self.next_id
+        self.next_id += 1
+        return task_id
+
+    # запись изменения в журнал - сразу при применении, так порядок в журнале совпадает
+    # с порядком изменений. снимок снимается тут же: в цикле событий копируются только
+    # списки задач, а журнал и сам снимок пишут потоки хранилища
+    def _log(self, board_name, delta):
+        if self.storage is None:
+            return
+        self.last_seq = self.storage.append(board_name, delta)
+        if self.storage.should_snapshot():
+            self.storage.snapshot(self.tasks, self.next_id)
+
+    # вызывает callback, когда запись seq окажется на диске. порядок вызовов - порядок
+    # постановки, даже если запись уже там: иначе снимок доски обогнал бы ее дельту
+    def _after_durable(self, seq, callback):
+        if self.storage is None or (seq <= self.durable_seq and not self.durable_waiters):
+            callback()
+        else:
+            self.durable_waiters.append((seq, callback))
+
+    # future, который завершится, когда запись seq окажется на диске (None - уже там)
+    def _durable(self, seq):
+        if self.storage is None or seq <= self.storage.durable:
+            return None
+        future = self.loop.create_future()
+        self.durable_waiters.append((seq, lambda: future.done() or future.set_result(None)))
+        return future
+
+    def _durable_reached(self, seq):
+        self.durable_seq = max(self.durable_seq, seq)
+        waiters = self.durable_waiters
+        while waiters and waiters[0][0] <= self.durable_seq:
+            waiters.popleft()[1]()
+
+    def _subscribe(self, conn, board_name):
+        if board_name not in conn.boards:
+            conn.boards.add(board_name)
+            self.subscribers.setdefault(board_name, set()).add(conn)
+
+    def _unsubscribe(self, conn, board_name=None):
+        for name in ([board_name] if board_name is not None else list(conn.boards)):
+            conn.boards.discard(name)
+            self.subscribers.get(name, set()).discard(conn)
+
+    # отключение без ожидания: сокет закрываем сразу, неотправленное выбрасываем
+    def _drop(self, conn):
+        if conn.closed:
+            return
+        conn.closed = True
+        self._unsubscribe(conn)
+        self.connections.discard(conn)
+        current = asyncio.current_task()
+        for task in (conn.task, conn.sender):
+            if task is not None and task is not current:
+                task.cancel()
+        conn.writer.transport.abort()
+
+    def evict(self, conn, reason):
+        if not conn.closed:
+            self.evicted += 1
+            print(f"Клиент {conn.peer} отключен: {reason}")
+            self._drop(conn)
+
+    def _deliver(self, conns, data):
+        for conn in conns:
+            if not conn.send(data):
+                self.evict(conn, "очередь отправки переполнена")
+
+    # ответ одному клиенту; уходит после всех изменений, которые уже сделаны, но еще не на диске
+    def _send(self, conn, message):
+        self._after_durable(self.last_seq, partial(self._deliver, (conn,), (message + '\n').encode('utf-8')))
+
+    # кладем сообщение в очереди подписчиков, когда последняя запись журнала окажется на диске;
+    # подписчики - те, что есть сейчас: кто подпишется позже, получит снимок уже с изменением.
+    # сам вызов никогда не ждет ни сеть, ни диск
+    def broadcast(self, board_name, message):
+        conns = list(self.subscribers.get(board_name, ()))
+        self._after_durable(self.last_seq, partial(self._deliver, conns, (message + '\n').encode('utf-8')))
+
+    def apply_delta(self, board_name, delta):
+        result = self.tasks[board_name].apply(delta, self._new_id)
+        if result is None:
+            print(f"Дельта для доски {board_name} пропущена: задачи {delta.get('id')} уже нет")
+            return None
+        self._log(board_name, result)
+        self.broadcast(board_name, f"DELTA:{board_name}:{json.dumps(result)}")
+        return result
+
+    async def handle_client(self, reader, writer):
+        conn = Connection(writer, self.queue_size)
+        conn.task = asyncio.current_task()
+        conn.sender = asyncio.ensure_future(self._sender(conn))
+        self.connections.add(conn)
+        try:
+            while not conn.closed:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    data = line.decode('utf-8').strip()
+                except UnicodeDecodeError:
+                    # это тоже ValueError - ловим до общего обработчика и пропускаем только команду
+                    print(f"Клиент {conn.peer} прислал команду не в UTF-8")
+                    continue
+                waiter = self.dispatch(conn, data)
+                # следующую команду клиента читаем, когда его изменение уже на диске;
+                # остальные клиенты тем временем работают, и их записи уходят в ту же пачку fsync
+                if waiter is not None:
+                    await waiter
+        except ValueError:
+            # readline бросает ValueError, если строка длиннее max_line
+            print(f"Клиент {conn.peer} прислал слишком длинную команду")
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self._drop(conn)
+
+    # пишем в сокет все, что накопилось в очереди, одним write
+    async def _sender(self, conn):
+        queue, writer = conn.queue, conn.writer
+        try:
+            while True:
+                chunks = [await queue.get()]
+                while not queue.empty():
+                    chunks.append(queue.get_nowait())
+                writer.write(b''.join(chunks))
+                await asyncio.wait_for(writer.drain(), self.drain_timeout)
+        except asyncio.TimeoutError:
+            self.evict(conn, "не принимает данные")
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+
+    # выполняет команду; если она что-то записала в журнал - возвращает future ожидания fsync
+    def dispatch(self, conn, data):
+        if not data:
+            return None
+        parts = data.split(':', 2)
+        command = parts[0]
+        board_name = parts[1] if len(parts) > 1 else "Главная доска"
+        payload = parts[2] if len(parts) > 2 else None
+
+        if command == 'GET_BOARDS':
+            self._send(conn, f"BOARDS:{json.dumps(list(self.tasks))}")
+            return None
+
+        if command not in BOARD_COMMANDS:
+            print(f"Неизвестная команда {command!r} для доски {board_name}")
+            self._send(conn, f"ERROR:Неизвестная команда {command}")
+            return None
+        if command == "UNSUBSCRIBE":
+            self._unsubscribe(conn, board_name)
+            return None
+
+        # доску создают только команды, которые ее открывают или пишут в нее
+        # (CREATE - только это и делает). DELTA ссылается на задачи, значит, доска уже должна быть
+        seq = self.last_seq
+        if board_name not in self.tasks:
+            if command not in CREATING_COMMANDS:
+                self._send(conn, f"ERROR:Нет доски {board_name}")
+                return None
+            self.tasks[board_name] = Board(board_name)
+            self._log(board_name, {"op": "create"})
+            print(f"Создана новая доска: {board_name}")
+        board = self.tasks[board_name]
+        if command != "CREATE":
+            self._subscribe(conn, board_name)
+
+        try:
+            if command == 'GET_TASKS':
+                self._send(conn, f"TASKS:{board_name}:{json.dumps(board.snapshot())}")
+            elif command in ('ADD', 'DELTA', 'UPDATE') and not payload:
+                print(f"{command} Error: Payload is missing for board {board_name}")
+            elif command == 'ADD':
+                self.apply_delta(board_name, {"op": "insert", "task": json.loads(payload)})
+            elif command == 'DELTA':
+                self.apply_delta(board_name, json.loads(payload))
+            elif command == 'UPDATE':
+                board.replace(json.loads(payload), self._new_id)
+                self._log(board_name, {"op": "replace", "tasks": board.tasks, "version": board.version})
+                self.broadcast(board_name, f"TASKS:{board_name}:{json.dumps(board.snapshot())}")
+        except (json.JSONDecodeError, KeyError, TypeError, ValueError) as e:
+            print(f"Некорректная команда {command} для доски {board_name}: {e}")
+        return self._durable(self.last_seq) if self.last_seq > seq else None
+
+
+def main():
+    import argparse
+
+    from Task_Storage import TaskStorage
+
+    parser = argparse.ArgumentParser(description="Сервер задач")
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=5555)
+    parser.add_argument('--queue-size', type=int, default=WRITE_QUEUE_SIZE)
+    parser.add_argument('--max-frame', type=int, default=MAX_LINE, help="максимальная длина команды, байт")
+    parser.add_argument('--data', default='task_data', help="каталог журнала и снимков")
+    parser.add_argument('--memory', action='store_true', help="не сохранять доски на диск")
+    args = parser.parse_args()
+
+    async def serve():
+        storage = None if args.memory else TaskStorage(args.data)
+        async with AsyncTaskServer(args.host, args.port, args.queue_size, storage=storage,
+                                   max_line=args.max_frame) as server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        print("Останавливаем сервер...")
+
+
+if __name__ == "__main__":
+    main()
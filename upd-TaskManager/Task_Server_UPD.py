@@ -1,147 +1,182 @@
-import socket
-import threading
-import json
-
-
-class TaskServer:
-    def __init__(self, host='localhost', port=5555):
-        self.host = host
-        self.port = port
-        self.clients = [] #клиенты как кортеж
-        self.tasks = {}
-        self.lock = threading.Lock()
-        self.tasks["Главная доска"] = []
-
-    def broadcast_board(self, board_name):
-        tasks_for_board = self.tasks.get(board_name, [])
-        message = f"TASKS:{board_name}:{json.dumps(tasks_for_board)}"
-
-        with self.lock:
-            for client_socket, client_board in self.clients[:]:
-                if client_board == board_name:
-                    try:
-                        client_socket.send((message + '\n').encode('utf-8'))
-                    except:
-                        self._remove_client(client_socket) #если не получилось - удаляем клиента
-
-    def _remove_client(self, client_socket):
-        self.clients = [
-            (s, b) for s, b in self.clients if s != client_socket
-        ]
-
-    def _add_client_to_board(self, client_socket, board_name):
-        self._remove_client(client_socket)
-        self.clients.append((client_socket, board_name))
-        print(f"Клиент {client_socket.getpeername()} привязан к доске '{board_name}'")
-
-    def handle_client(self, client_socket):
-        print(f"Новое подключение: {client_socket.getpeername()}")
-        current_board = None
-
-        try:
-            while True:
-                data = client_socket.recv(1024).decode('utf-8').strip()
-                if not data:
-                    break
-                print(f"Получено: {data}")
-
-                parts = data.split(':', 2)
-                command = parts[0]
-                board_name = parts[1] if len(parts) > 1 else "Главная доска"
-                payload = parts[2] if len(parts) > 2 else None
-
-                with self.lock:
-                    if board_name not in self.tasks:
-                        self.tasks[board_name] = []
-                        print(f"Создана новая доска: {board_name}")
-
-                tasks_for_board = self.tasks[board_name]
-
-                if command in ["ADD", "UPDATE", "GET_TASKS"]:
-                    if board_name != current_board:
-                        self._add_client_to_board(client_socket, board_name)
-                        current_board = board_name
-
-                if command == "ADD":
-                    try:
-                        if payload: #перед тем как парсить, чекаем что не нон
-                            task = json.loads(payload)
-                            tasks_for_board.append(task)
-                            self.broadcast_board(board_name)
-                        else:
-                            print(f"ADD Error: Payload is missing for board {board_name}")
-                    except json.JSONDecodeError as e:
-                        print(f"JSON Decode Error for ADD on {board_name}: {e}")
-
-                elif command == 'UPDATE':
-                    try:
-                        if payload:
-                            update_tasks = json.loads(payload)
-                            self.tasks[board_name] = update_tasks
-                            self.broadcast_board(board_name)
-                        else:
-                            print(f"UPDATE Error: Payload is missing for board {board_name}")
-                    except json.JSONDecodeError as e:
-                        print(f"JSON Decode Error for UPDATE on {board_name}: {e}")
-
-                elif command == 'GET_TASKS':
-
-                    self.send_tasks_to_client(client_socket, board_name)
-
-                elif command == 'GET_BOARDS':
-                    self.send_board_list_to_client(client_socket)
-
-
-        except Exception as e:
-            print(f"Ошибка в handle_client: {e}")
-        finally:
-            with self.lock:
-                self._remove_client(client_socket)
-            client_socket.close()
-
-    def send_tasks_to_client(self, client_socket, board_name):
-        tasks_for_board = self.tasks.get(board_name, [])
-        message = f"TASKS:{board_name}:{json.dumps(tasks_for_board)}"
-        try:
-            client_socket.send((message + '\n').encode('utf-8'))
-        except Exception as e:
-            print(f"Ошибка отправки задач клиенту: {e}")
-
-    def send_board_list_to_client(self, client_socket):
-        board_names = list(self.tasks.keys())
-        message = f"BOARDS:{json.dumps(board_names)}"
-        try:
-            client_socket.send((message + '\n').encode('utf-8'))
-        except Exception as e:
-            print(f"Ошибка отправки списка досок клиенту: {e}")
-
-
-#погнал
-    def start(self):
-        server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        server_socket.bind((self.host, self.port))
-        server_socket.listen(5)
-
-        print(f"Сервер задач запущен на {self.host}:{self.port}")
-
-        try:
-            while True:
-                client_socket, address = server_socket.accept()
-
-                client_thread = threading.Thread(
-                    target=self.handle_client,
-                    args=(client_socket,),
-                    daemon=True
-                )
-                client_thread.start()
-
-        except KeyboardInterrupt:
-            print("Останавливаем сервер...")
-        finally:
-            server_socket.close()
+# поля задачи, которые можно менять через set_field
+TASK_FIELDS = ("text", "priority", "completed")
+PRIORITIES = ("low", "medium", "high")
+
+def _check_field(field, value):
+    if field == "text":
+        ok = isinstance(value, str)
+    elif field == "priority":
+        ok = value in PRIORITIES
+    elif field == "completed":
+        ok = isinstance(value, bool)
+    else:
+        raise ValueError(f"Нельзя менять поле {field!r}")
+    if not ok:
+        raise ValueError(f"Некорректное значение поля {field}: {value!r}")
+
+
+# задача от клиента: только известные поля, все проверены
+def _check_task(task):
+    if not isinstance(task, dict):
+        raise ValueError(f"Задача должна быть объектом, получено {task!r}")
+    for field in TASK_FIELDS:
+        _check_field(field, task[field])
+    return {field: task[field] for field in TASK_FIELDS}
+
+
+# доска: задачи по порядку + индекс id -> задача и номер версии.
+# каждое изменение увеличивает версию на 1, так клиент замечает пропущенные дельты
+class Board:
+    def __init__(self, name):
+        self.name = name
+        self.tasks = []
+        self.index = {}
+        self.version = 0
+        # список tasks попал в снимок хранилища как есть: перед изменением его надо скопировать
+        self.shared = False
+        # словари задач тоже общие со снимком, кроме тех, чьи id лежат в fresh
+        # (вставлены или уже скопированы после снимка)
+        self.tasks_shared = False
+        self.fresh = set()
+
+    # копирование при записи: снимок забирает сам список, а копию делает первое изменение после него
+    def _own_tasks(self):
+        if self.shared:
+            self.tasks = list(self.tasks)
+            self.shared = False
+
+    # то же для словаря задачи: пока снимок может его читать, меняем копию и ставим ее
+    # на место старого в списке и в индексе
+    def _own_task(self, task):
+        if not self.tasks_shared or task["id"] in self.fresh:
+            return task
+        self._own_tasks()
+        copy = dict(task)
+        self.tasks[self.tasks.index(task)] = copy
+        self.index[copy["id"]] = copy
+        self.fresh.add(copy["id"])
+        return copy
+
+    # отдаем список задач в снимок хранилища. ничего не копируем: список и словари
+    # становятся общими, и их скопирует первое изменение после снимка
+    def freeze(self):
+        self.shared = self.tasks_shared = True
+        self.fresh = set()
+        return {"version": self.version, "tasks": self.tasks}
+
+    def snapshot(self):
+        return {"version": self.version, "tasks": self.tasks}
+
+    @classmethod
+    def load(cls, name, snapshot):
+        board = cls(name)
+        board.tasks = snapshot["tasks"]
+        board.index = {task["id"]: task for task in board.tasks}
+        board.version = snapshot["version"]
+        return board
+
+    # повтор уже примененной дельты из журнала (id в ней уже выданы).
+    # возвращает наибольший id, который встретился
+    def replay(self, delta):
+        op = delta["op"]
+        if op == "create":
+            return 0
+        if op == "replace":
+            # в журнале задачи уже проверены и с окончательными id
+            self.tasks = delta["tasks"]
+            self.index = {task["id"]: task for task in self.tasks}
+            self.version = delta["version"]
+            return max((task["id"] for task in self.tasks), default=0)
+        if op == "insert":
+            self.apply(delta, lambda: delta["task"]["id"])
+            return delta["task"]["id"]
+        self.apply(delta, None)
+        return 0
+
+    # полная замена списка (старая команда UPDATE). id от клиента оставляем, только если
+    # это id задачи с этой же доски и он не повторяется, остальным выдаем новые -
+    # иначе клиент мог бы занять чужой или еще не выданный id
+    def replace(self, tasks, new_id):
+        if not isinstance(tasks, list):
+            raise ValueError("UPDATE: ожидается список задач")
+        clean = [_check_task(task) for task in tasks]
+        used = set()
+        for task, source in zip(clean, tasks):
+            task_id = source.get("id")
+            if type(task_id) is not int or task_id not in self.index or task_id in used:
+                task_id = new_id()
+            task["id"] = task_id
+            used.add(task_id)
+        self.tasks = clean
+        self.shared = self.tasks_shared = False
+        self.fresh = set()
+        self.index = {task["id"]: task for task in clean}
+        self.version += 1
+
+    # позиция для вставки в список из size элементов: None - в конец, иначе целое,
+    # которое прижимаем к границам
+    @staticmethod
+    def _position(index, size):
+        if index is None:
+            return size
+        if type(index) is not int:
+            raise ValueError(f"Некорректная позиция: {index!r}")
+        return max(0, min(index, size))
+
+    # применяем дельту. возвращаем ее в том виде, в каком она уйдет подписчикам
+    # (с новой версией и id вставленной задачи), или None, если задачи уже нет.
+    # все проверки - до первого изменения доски, чтобы ошибка не оставила ее наполовину измененной
+    def apply(self, delta, new_id):
+        op = delta["op"]
+        if op == "insert":
+            task = _check_task(delta["task"])
+            index = self._position(delta.get("index"), len(self.tasks))
+            task["id"] = new_id()
+            self._own_tasks()
+            self.tasks.insert(index, task)
+            self.index[task["id"]] = task
+            if self.tasks_shared:
+                self.fresh.add(task["id"])
+            result = {"op": op, "index": index, "task": task}
+
+        elif op == "set_field":
+            _check_field(delta["field"], delta["value"])
+            task = self.index.get(delta["id"])
+            if task is None:
+                return None
+            task = self._own_task(task)
+            task[delta["field"]] = delta["value"]
+            result = {"op": op, "id": task["id"], "field": delta["field"], "value": delta["value"]}
+
+        elif op == "delete":
+            task = self.index.pop(delta["id"], None)
+            if task is None:
+                return None
+            self._own_tasks()
+            self.tasks.remove(task)
+            result = {"op": op, "id": task["id"]}
+
+        elif op == "move":
+            task = self.index.get(delta["id"])
+            if task is None:
+                return None
+            index = self._position(delta.get("index"), len(self.tasks) - 1)
+            self._own_tasks()
+            self.tasks.remove(task)
+            self.tasks.insert(index, task)
+            result = {"op": op, "id": task["id"], "index": index}
+
+        else:
+            raise ValueError(f"Неизвестная операция: {op!r}")
+
+        self.version += 1
+        result["version"] = self.version
+        return result
 
 
 if __name__ == "__main__":
-    server = TaskServer()
-    server.start()
\ No newline at end of file
+    # сервер один - на asyncio (Task_Server_Async); этот файл остается точкой входа,
+    # а здесь лежит общая для сервера и хранилища доска
+    from Task_Server_Async import main
+
+    main()
@@ -0,0 +1,70 @@
+import os
+import copy
+import json
+import shutil
+import tempfile
+
+from Task_Server_UPD import Board
+from Task_Storage import TaskStorage, SNAPSHOT_FILE
+
+# проверка снимка хранилища: доски меняются сразу после storage.snapshot(), пока поток снимков
+# еще не записал файл (его держит commit_delay потока записи). в снимке должно оказаться ровно
+# состояние на момент вызова, а загрузка (снимок + хвост журнала) - давать текущее состояние
+
+
+def _state(boards):
+    return {name: {"version": board.version, "tasks": board.tasks} for name, board in boards.items()}
+
+
+def run_snapshot_test(boards_count=4, tasks=200, commit_delay=0.2):
+    path = tempfile.mkdtemp(prefix='task_snapshot_')
+    ids = iter(range(1, 1 << 62))
+
+    def new_id():
+        return next(ids)
+
+    def change(board_name, delta):
+        result = boards[board_name].apply(delta, new_id)
+        return storage.append(board_name, result)
+
+    try:
+        storage = TaskStorage(path, snapshot_every=1 << 62, commit_delay=commit_delay)
+        boards, _ = storage.load()
+        for b in range(boards_count):
+            boards[f"доска {b}"] = Board(f"доска {b}")
+        for i in range(tasks):
+            seq = change(f"доска {i % boards_count}",
+                         {"op": "insert", "task": {"text": f"задача {i}", "priority": "low", "completed": False}})
+        storage.wait(seq)
+
+        expected = copy.deepcopy(_state(boards))
+        seq = storage.snapshot(boards, tasks + 1)
+
+        # меняем каждую задачу, пока снимок ждет своей очереди, и по паре раз одну и ту же
+        for name, board in boards.items():
+            for task in list(board.tasks):
+                change(name, {"op": "set_field", "id": task["id"], "field": "completed", "value": True})
+                change(name, {"op": "set_field", "id": task["id"], "field": "text", "value": "изменена"})
+            change(name, {"op": "insert", "index": 0, "task": {"text": "новая", "priority": "high", "completed": False}})
+            change(name, {"op": "set_field", "id": board.tasks[0]["id"], "field": "priority", "value": "low"})
+            change(name, {"op": "move", "id": board.tasks[-1]["id"], "index": 0})
+            last = change(name, {"op": "delete", "id": board.tasks[1]["id"]})
+        current = copy.deepcopy(_state(boards))
+        storage.wait(last)
+        storage.wait_snapshot(seq)
+        storage.close()
+
+        with open(os.path.join(path, SNAPSHOT_FILE), encoding='utf-8') as f:
+            saved = json.load(f)
+        assert saved["seq"] == seq, f"seq снимка {saved['seq']}, ожидался {seq}"
+        assert saved["boards"] == expected, "в снимок попали изменения, сделанные после него"
+
+        loaded, _ = TaskStorage(path).load()
+        assert _state(loaded) == current, "снимок + хвост журнала не совпадают с состоянием досок"
+        print(f"Снимок: {boards_count} досок, {tasks} задач, изменения во время записи снимка - OK")
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    run_snapshot_test()
@@ -0,0 +1,338 @@
+import os
+import json
+import time
+import threading
+
+from Task_Server_UPD import Board
+
+# хранилище досок на диске: журнал изменений (WAL) + периодические снимки.
+# в журнал пишутся уже примененные дельты (с id и версиями), по строке JSON [seq, доска, дельта].
+# запись в журнал - групповая: все, что накопилось, пока шел предыдущий fsync,
+# уходит одним write + одним fsync. снимок - все доски на момент seq; после него журнал
+# начинается с нового сегмента, а старые сегменты удаляются. в цикле событий сервера снимаем
+# только списки задач досок, журнал дописывает и переключает на новый сегмент поток записи,
+# а в файл снимок пишет отдельный поток. при запуске читаем снимок
+# и проигрываем только хвост журнала после него
+
+SNAPSHOT_FILE = 'snapshot.json'
+# новый снимок - после стольких записей журнала
+SNAPSHOT_EVERY = 200000
+# сколько подождать перед fsync, чтобы набрать пачку побольше (0 - не ждать)
+COMMIT_DELAY = 0.0
+
+
+def _segment_name(first_seq):
+    return f'wal-{first_seq:012d}.log'
+
+
+# fsync каталога, чтобы переименование и новые файлы пережили сбой питания
+def _fsync_dir(path):
+    if not hasattr(os, 'O_DIRECTORY'):
+        return
+    fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class TaskStorage:
+    def __init__(self, path, snapshot_every=SNAPSHOT_EVERY, commit_delay=COMMIT_DELAY):
+        self.path = path
+        self.snapshot_every = snapshot_every
+        self.commit_delay = commit_delay
+        os.makedirs(path, exist_ok=True)
+
+        self.cond = threading.Condition()
+        # строки журнала, ждущие записи. словарь среди них - снимок на этом месте журнала:
+        # все до него дописывается в старый сегмент, все после - уже в новый
+        self.pending = []
+        self.seq = 0       # номер последней записи
+        self.durable = 0   # до этого номера все уже на диске
+        self.since_snapshot = 0
+        self.commits = 0   # сколько было fsync журнала
+        # вызывается из потока записи с номером, до которого все уже на диске; асинхронный
+        # сервер так узнает о fsync, не занимая поток на каждое ожидание, как wait
+        self.on_durable = None
+        self.file = None
+        self.flusher = None
+        self.snapshotter = None
+        self.snapshot_job = None  # снимок, ждущий записи на диск
+        self.snapshot_seq = 0     # seq последнего записанного снимка
+        self.closed = False
+
+    def _segments(self):
+        return sorted(name for name in os.listdir(self.path) if name.startswith('wal-') and name.endswith('.log'))
+
+    # читаем снимок и хвост журнала, возвращаем (доски, следующий id задачи).
+    # недописанная последняя строка (сбой посреди записи) отрезается
+    def load(self):
+        boards = {}
+        next_id = 1
+        snapshot_seq = 0
+        snapshot_path = os.path.join(self.path, SNAPSHOT_FILE)
+        if os.path.exists(snapshot_path):
+            with open(snapshot_path, encoding='utf-8') as f:
+                data = json.load(f)
+            snapshot_seq = data["seq"]
+            next_id = data["next_id"]
+            boards = {name: Board.load(name, snapshot) for name, snapshot in data["boards"].items()}
+
+        seq = snapshot_seq
+        replayed = 0
+        for name in self._segments():
+            segment = os.path.join(self.path, name)
+            with open(segment, 'rb+') as f:
+                offset = 0
+                for line in f:
+                    try:
+                        if not line.endswith(b'\n'):
+                            raise ValueError("недописанная строка")
+                        seq, board_name, delta = json.loads(line)
+                    except ValueError:
+                        print(f"Журнал {name} обрезан на {offset} байте")
+                        f.truncate(offset)
+                        break
+                    offset += len(line)
+                    if seq <= snapshot_seq:
+                        continue
+                    board = boards.setdefault(board_name, Board(board_name))
+                    next_id = max(next_id, board.replay(delta) + 1)
+                    replayed += 1
+
+        self.seq = self.durable = seq
+        self.snapshot_seq = snapshot_seq
+        self.since_snapshot = seq - snapshot_seq
+        # дописываем в последний сегмент, а не заводим новый на каждом перезапуске
+        segments = self._segments()
+        if segments:
+            self.file = open(os.path.join(self.path, segments[-1]), 'ab')
+        else:
+            self._open_segment(seq + 1)
+        self.flusher = threading.Thread(target=self._flush_loop, daemon=True)
+        self.flusher.start()
+        self.snapshotter = threading.Thread(target=self._snapshot_loop, daemon=True)
+        self.snapshotter.start()
+        print(f"Загружено досок: {len(boards)}, из журнала проиграно записей: {replayed}")
+        return boards, next_id
+
+    def _open_segment(self, first_seq):
+        self.file = open(os.path.join(self.path, _segment_name(first_seq)), 'ab')
+        _fsync_dir(self.path)
+
+    # ставим запись в очередь журнала и возвращаем ее номер. порядок номеров - порядок
+    # применения, поэтому вызывать там же, где изменяется доска (в цикле событий сервера)
+    def append(self, board_name, delta):
+        line = json.dumps([0, board_name, delta], ensure_ascii=False)
+        with self.cond:
+            self.seq += 1
+            self.since_snapshot += 1
+            self.pending.append(f'[{self.seq}{line[2:]}\n')
+            self.cond.notify_all()
+            return self.seq
+
+    # ждем, пока запись seq окажется на диске
+    def wait(self, seq):
+        with self.cond:
+            while self.durable < seq and not self.closed:
+                self.cond.wait()
+
+    def _commit(self, lines):
+        if lines:
+            self.file.write(''.join(lines).encode('utf-8'))
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    # пишется только из потока записи (и из close, когда он уже остановлен)
+    def _write_pending(self):
+        with self.cond:
+            batch, self.pending = self.pending, []
+            last = self.seq
+        lines = []
+        for item in batch:
+            if isinstance(item, str):
+                lines.append(item)
+                continue
+            # снимок: все до него уже в нем, дальше журнал идет в новый сегмент
+            self._commit(lines)
+            lines = []
+            new_segment = _segment_name(item["seq"] + 1)
+            # если в текущий сегмент после загрузки еще ничего не писали, он и есть новый
+            if os.path.basename(self.file.name) != new_segment:
+                self.file.close()
+                self._open_segment(item["seq"] + 1)
+            with self.cond:
+                # предыдущий снимок, если его еще не успели записать, уже не нужен
+                self.snapshot_job = item
+                self.cond.notify_all()
+        self._commit(lines)
+        with self.cond:
+            self.durable = max(self.durable, last)
+            self.commits += 1
+            self.cond.notify_all()
+        if self.on_durable is not None:
+            self.on_durable(last)
+
+    def _flush_loop(self):
+        while True:
+            with self.cond:
+                while not self.pending and not self.closed:
+                    self.cond.wait()
+                if self.closed and not self.pending:
+                    return
+            if self.commit_delay:
+                time.sleep(self.commit_delay)
+            self._write_pending()
+
+    def should_snapshot(self):
+        return self.since_snapshot >= self.snapshot_every
+
+    # снимок всех досок. вызывать там же, где изменяются доски (в цикле событий сервера),
+    # сразу после append. ничего не копируем: снимок забирает сами списки и словари задач,
+    # а доска копирует их при первом изменении после этого (Board.freeze). так снимок -
+    # ровно состояние на seq, хотя журнал дописывает поток записи, а сериализует снимок
+    # поток снимков. возвращает seq снимка
+    def snapshot(self, boards, next_id):
+        data = {"next_id": next_id, "boards": {}}
+        for name, board in boards.items():
+            data["boards"][name] = board.freeze()
+        with self.cond:
+            data["seq"] = seq = self.seq
+            self.pending.append(data)
+            self.since_snapshot = 0
+            self.cond.notify_all()
+        return seq
+
+    def _write_snapshot(self, data):
+        seq = data["seq"]
+        tmp_path = os.path.join(self.path, SNAPSHOT_FILE + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, os.path.join(self.path, SNAPSHOT_FILE))
+        _fsync_dir(self.path)
+
+        # все, что до seq включительно, уже в снимке
+        new_segment = _segment_name(seq + 1)
+        for name in self._segments():
+            if name < new_segment:
+                os.remove(os.path.join(self.path, name))
+
+    def _snapshot_loop(self):
+        while True:
+            with self.cond:
+                while self.snapshot_job is None and not self.closed:
+                    self.cond.wait()
+                job, self.snapshot_job = self.snapshot_job, None
+            if job is None:
+                return
+            self._write_snapshot(job)
+            with self.cond:
+                self.snapshot_seq = job["seq"]
+                self.cond.notify_all()
+
+    # ждем, пока снимок seq окажется на диске
+    def wait_snapshot(self, seq):
+        with self.cond:
+            while self.snapshot_seq < seq and not self.closed:
+                self.cond.wait()
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+        if self.flusher is not None:
+            self.flusher.join()
+        if self.snapshotter is not None:
+            self.snapshotter.join()
+        if self.file is not None:
+            self._write_pending()
+            self.file.close()
+        # снимок, который поток записи отдал уже после остановки потока снимков
+        if self.snapshot_job is not None:
+            self._write_snapshot(self.snapshot_job)
+            self.snapshot_seq, self.snapshot_job = self.snapshot_job["seq"], None
+
+
+if __name__ == "__main__":
+    import shutil
+    import argparse
+    import tempfile
+
+    parser = argparse.ArgumentParser(description="Замеры хранилища задач")
+    parser.add_argument('--tasks', type=int, default=1000000)
+    parser.add_argument('--boards', type=int, default=10000)
+    parser.add_argument('--writers', type=int, default=64, help="потоков-писателей, как клиентов у сервера")
+    parser.add_argument('--updates', type=int, default=100000, help="изменений после снимка (хвост журнала)")
+    parser.add_argument('--dir', default=None)
+    args = parser.parse_args()
+
+    path = args.dir or tempfile.mkdtemp(prefix='task_storage_')
+    shutil.rmtree(path, ignore_errors=True)
+    lock = threading.Lock()
+    ids = iter(range(1, 1 << 62))
+
+    # писатели ведут себя как клиенты сервера: изменение + запись в журнал по одному (у сервера
+    # это цикл событий, здесь - общая блокировка), ожидание fsync - уже без нее, так что
+    # ожидающие собираются в одну пачку
+    def run_writers(storage, boards, count, make_delta):
+        def writer(worker):
+            for i in range(worker, count, args.writers):
+                board_name, delta = make_delta(i)
+                with lock:
+                    result = boards[board_name].apply(delta, lambda: next(ids))
+                    seq = storage.append(board_name, result)
+                storage.wait(seq)
+
+        threads = [threading.Thread(target=writer, args=(w,)) for w in range(args.writers)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return time.perf_counter() - start
+
+    def insert(i):
+        return f"доска {i % args.boards}", {"op": "insert", "task": {"text": f"задача {i}", "priority": "low", "completed": False}}
+
+    def toggle(i):
+        board_name = f"доска {i % args.boards}"
+        return board_name, {"op": "set_field", "id": boards[board_name].tasks[0]["id"], "field": "completed", "value": i % 2 == 0}
+
+    storage = TaskStorage(path, snapshot_every=1 << 62)
+    boards, _ = storage.load()
+    for b in range(args.boards):
+        boards[f"доска {b}"] = Board(f"доска {b}")
+
+    elapsed = run_writers(storage, boards, args.tasks, insert)
+    print(f"Вставка {args.tasks} задач в {args.boards} досок: {elapsed:.2f} сек, "
+          f"{args.tasks / elapsed:.0f} записей/сек, fsync: {storage.commits} "
+          f"(в среднем {args.tasks / max(storage.commits, 1):.1f} записей на fsync)")
+    storage.close()
+
+    start = time.perf_counter()
+    boards, next_id = TaskStorage(path).load()
+    print(f"Восстановление только из журнала: {time.perf_counter() - start:.2f} сек")
+
+    storage = TaskStorage(path, snapshot_every=1 << 62)
+    boards, next_id = storage.load()
+    start = time.perf_counter()
+    seq = storage.snapshot(boards, next_id)
+    captured = time.perf_counter() - start
+    storage.wait_snapshot(seq)
+    print(f"Снимок: в цикле событий {captured:.3f} сек, запись в фоне {time.perf_counter() - start - captured:.2f} сек")
+
+    commits = storage.commits
+    elapsed = run_writers(storage, boards, args.updates, toggle)
+    print(f"{args.updates} изменений после снимка: {elapsed:.2f} сек, {args.updates / elapsed:.0f} записей/сек, "
+          f"fsync: {storage.commits - commits}")
+    storage.close()
+
+    start = time.perf_counter()
+    boards, next_id = TaskStorage(path).load()
+    print(f"Восстановление из снимка + хвоста журнала: {time.perf_counter() - start:.2f} сек, "
+          f"задач: {sum(len(b.tasks) for b in boards.values())}")
+
+    if args.dir is None:
+        shutil.rmtree(path, ignore_errors=True)